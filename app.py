@@ -1,8 +1,12 @@
 import streamlit as st
+from ifsneo import prefetch_references
 
 # Configuration de la page en mode large
 st.set_page_config(layout="wide")
 
+# Téléchargement des fichiers de référence en arrière-plan, pendant la lecture de cette page
+prefetch_references()
+
 # Titre principal
 st.title("Extracteur de données du formulaire IFS NEO")
 
@@ -14,6 +18,9 @@ Vous pouvez naviguer entre :
 - **Rapport IFS V8** : Pour extraire les données des fichiers liés aux audits IFS V8.
 - **Extraction NEO** : Pour utiliser la version avancée avec des options de filtrage et modification de données.
 - **checklistexcel** : Pour extraire les exigences du rapport et les télécharger dans un fichier Excel.
+- **extractionmultiple** : Pour extraire en une fois un lot de fichiers (.ifs ou archives zip) dans un classeur consolidé par COID.
+- **analyses** : Pour suivre les notes de tous les audits enregistrés dans la base (répartition par chapitre, non-conformités fréquentes, évolution par site, recherche dans les explications).
+- **comparaison** : Pour comparer deux audits d'un même site (notes modifiées, nouvelles non-conformités, données du site).
 
 Cliquez sur les pages dans la barre latérale pour accéder à ces différentes versions.
 """)
@@ -28,6 +35,9 @@ with st.expander("Explication des fonctionnalités générales du projet"):
     - **Rapport IFS V8** : Extraction des informations des fichiers liés à un audit IFS V8.
     - **Extraction NEO** : Une version plus avancée qui permet de filtrer et modifier les données extraites, avec des options supplémentaires basées sur des UUID spécifiques.
     - **checklistexcel** : Extraction des exigences du rapport et téléchargement dans un fichier Excel.
+    - **extractionmultiple** : Extraction en parallèle d'un lot d'audits, avec un rapport par fichier.
+    - **analyses** : Statistiques multi-audits calculées à partir de la base des audits.
+    - **comparaison** : Différences entre deux audits d'un même site.
 
     Utilisez les pages du **menu en haut à gauche** pour explorer ces versions.
     """)
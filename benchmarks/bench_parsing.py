@@ -0,0 +1,47 @@
+"""Peak memory and time of load_document() in streaming and standard mode.
+
+    python -m benchmarks.bench_parsing --size-mb 50
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import write_document
+from ifsneo.parsing import load_document
+
+
+def measure(path, streaming):
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        document = load_document(f, streaming=streaming)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del document
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=float, default=50, help="approximate size of the synthetic file")
+    args = parser.parse_args()
+
+    # Half of the payload is checklist text, half is unrelated attachments
+    text_length = 2000
+    n_requirements = max(int(args.size_mb * 1024 * 1024 / 2 / (2 * text_length)), 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic.ifs')
+        size = write_document(path, n_requirements=n_requirements, text_length=text_length,
+                              extra_sections=n_requirements * 2)
+        print(f"file: {size / 1e6:.1f} MB, {n_requirements} requirements")
+        for streaming in (False, True):
+            elapsed, peak = measure(path, streaming)
+            mode = "streaming" if streaming else "json.load"
+            print(f"{mode:>10}: {elapsed:6.2f} s, peak {peak / 1e6:7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
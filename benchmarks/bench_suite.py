@@ -0,0 +1,185 @@
+"""Time and peak memory of every stage of the extraction, on a synthetic document.
+
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --requirements 2000 --text-length 1000 --nesting-depth 5
+    python -m benchmarks.bench_suite --json results.json
+    python -m benchmarks.bench_suite --baseline results.json --tolerance 0.25
+
+Each stage is run --repeat times; the best time is kept, and the peak
+memory allocated by the stage is measured with tracemalloc on a separate
+run. With --baseline, the exit status is 1 when a stage is slower than the
+baseline by more than --tolerance, so the suite can gate a deployment.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+from benchmarks.synthetic import make_uuid_mapping, write_document
+from ifsneo.exports import checklist_frame, excel_engine, write_checklist_workbook, write_site_data_workbook
+from ifsneo.extraction import checklist_table, extract_from_document, extract_from_flattened, flatten_json_safe
+from ifsneo.mapping import FLATTENED_FIELD_MAPPING, SITE_SCHEMA
+from ifsneo.parsing import load_document
+
+
+def _measure(function, repeat):
+    # Best of repeat runs for the time, then one traced run for the peak memory
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    del result
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def stages(path, uuid_mapping_df):
+    """Return [(stage name, unit, size, function)] for the document at path.
+
+    size is what the throughput is computed on: file bytes for parsing and
+    flattening, rows (requirements or fields) for the other stages.
+    """
+    def parse(streaming):
+        with open(path, 'rb') as f:
+            return load_document(f, streaming=streaming)
+
+    document = parse(True)
+    full_document = parse(False)
+    flattened = flatten_json_safe(full_document)
+    table = checklist_table(document, uuid_mapping_df)
+    frame = checklist_frame(table)
+    site_df = _site_frame(extract_from_document(document, SITE_SCHEMA))
+    file_size = os.path.getsize(path)
+    n_requirements = len(uuid_mapping_df)
+
+    result = [
+        ("parse (json.load)", 'MB', file_size, lambda: parse(False)),
+        ("parse (streaming)", 'MB', file_size, lambda: parse(True)),
+        ("flatten_json_safe", 'MB', file_size, lambda: flatten_json_safe(full_document)),
+        ("extract_from_flattened", 'fields', len(FLATTENED_FIELD_MAPPING),
+         lambda: extract_from_flattened(flattened, FLATTENED_FIELD_MAPPING)),
+        ("extract_from_document", 'fields', len(SITE_SCHEMA), lambda: extract_from_document(document, SITE_SCHEMA)),
+        ("checklist join", 'requirements', n_requirements, lambda: checklist_table(document, uuid_mapping_df)),
+    ]
+    engines = ['openpyxl'] if excel_engine() == 'openpyxl' else ['xlsxwriter', 'openpyxl']
+    for engine in engines:
+        result.append((f"checklist workbook ({engine})", 'requirements', n_requirements,
+                       lambda engine=engine: _checklist_workbook(frame, engine)))
+    result.append(("site data workbook", 'fields', len(site_df), lambda: write_site_data_workbook(site_df, BytesIO())))
+    return result
+
+
+def _site_frame(extracted_data):
+    import pandas as pd
+
+    return pd.DataFrame(list(extracted_data.items()), columns=["Field", "Value"])
+
+
+def _checklist_workbook(frame, engine):
+    if engine == 'xlsxwriter':
+        write_checklist_workbook(frame, BytesIO())
+    else:
+        from ifsneo.exports import _write_checklist_workbook_openpyxl
+
+        _write_checklist_workbook_openpyxl(frame, BytesIO())
+
+
+def run(n_requirements, text_length, nesting_depth, extra_sections, repeat, seed=0):
+    """Run every stage and return the report as a dict."""
+    uuid_mapping_df = make_uuid_mapping(n_requirements)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic.ifs')
+        size = write_document(path, n_requirements=n_requirements, text_length=text_length,
+                              nesting_depth=nesting_depth, extra_sections=extra_sections, seed=seed)
+        results = []
+        for name, unit, amount, function in stages(path, uuid_mapping_df):
+            seconds, peak = _measure(function, repeat)
+            amount = amount / 1e6 if unit == 'MB' else amount
+            results.append({
+                'stage': name,
+                'seconds': seconds,
+                'throughput': amount / seconds if seconds else float('inf'),
+                'unit': f"{unit}/s",
+                'peak_mb': peak / 1e6,
+            })
+    return {
+        'document': {
+            'bytes': size, 'requirements': n_requirements, 'text_length': text_length,
+            'nesting_depth': nesting_depth, 'extra_sections': extra_sections, 'seed': seed,
+        },
+        'python': platform.python_version(),
+        'stages': results,
+    }
+
+
+def print_report(report, baseline=None):
+    document = report['document']
+    print(f"document: {document['bytes'] / 1e6:.1f} MB, {document['requirements']} requirements, "
+          f"text length {document['text_length']}, nesting depth {document['nesting_depth']}")
+    previous = {stage['stage']: stage for stage in baseline['stages']} if baseline else {}
+    for stage in report['stages']:
+        line = (f"{stage['stage']:<34} {stage['seconds'] * 1000:9.2f} ms "
+                f"{stage['throughput']:12.1f} {stage['unit']:<15} peak {stage['peak_mb']:8.1f} MB")
+        if stage['stage'] in previous:
+            line += f"  ({stage['seconds'] / previous[stage['stage']]['seconds'] - 1:+.0%} vs baseline)"
+        print(line)
+
+
+def regressions(report, baseline, tolerance):
+    """Stages slower than in baseline by more than tolerance (0.25 = 25 %)."""
+    previous = {stage['stage']: stage['seconds'] for stage in baseline['stages']}
+    return [
+        stage['stage'] for stage in report['stages']
+        if stage['stage'] in previous and stage['seconds'] > previous[stage['stage']] * (1 + tolerance)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_suite', description="Extraction benchmarks")
+    parser.add_argument('--requirements', type=int, default=250, help="number of requirements in the document")
+    parser.add_argument('--text-length', type=int, default=200, help="length of each explanation text")
+    parser.add_argument('--nesting-depth', type=int, default=0, help="depth of the extra nesting in each scoring")
+    parser.add_argument('--extra-sections', type=int, default=0, help="unrelated sections (attachments)")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per stage (the best time is kept)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--baseline', help="results of a previous run (--json) to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        params = {'requirements': args.requirements, 'text_length': args.text_length,
+                  'nesting_depth': args.nesting_depth, 'extra_sections': args.extra_sections, 'seed': args.seed}
+        if any(baseline['document'].get(key) != value for key, value in params.items()):
+            print("warning: the baseline was measured on another document", file=sys.stderr)
+
+    report = run(args.requirements, args.text_length, args.nesting_depth, args.extra_sections, args.repeat, args.seed)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if baseline:
+        slower = regressions(report, baseline, args.tolerance)
+        if slower:
+            print(f"regression (> {args.tolerance:.0%}): {', '.join(slower)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# Generator of synthetic IFS NEO (.ifs) documents for the benchmarks.
+import json
+import random
+
+from ifsneo.mapping import AUDIT_DATE_PATH, QUESTIONS, SITE_SCHEMA
+from ifsneo.paths import get_path, split_path
+
+SCORE_LABELS = ['A', 'B', 'C', 'D', 'NA', 'MAJOR', 'KO']
+
+WORDS = ["allergènes", "nettoyage", "traçabilité", "température", "étiquetage", "fournisseur",
+         "allergen", "cleaning", "traceability", "temperature", "labelling", "supplier"]
+
+
+def _text(rng, length):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def _answer(rng, spec, text_length):
+    if spec.label == "N° COID du portail":
+        return str(rng.randint(10000, 99999))
+    if spec.type == 'integer':
+        return rng.randint(1, 500)
+    if spec.type == 'number':
+        return round(rng.uniform(-90, 90), 6)
+    if spec.type == 'boolean':
+        return rng.choice([True, False])
+    return _text(rng, min(text_length, 80))
+
+
+def _set_path(document, path, value):
+    # Create the dicts and lists along path (a digit segment is a list index)
+    node = document
+    for segment, next_segment in zip(path, path[1:]):
+        child = [] if next_segment.isdigit() else {}
+        if isinstance(node, list):
+            index = int(segment)
+            while len(node) <= index:
+                node.append(None)
+            node[index] = node[index] if node[index] is not None else child
+            node = node[index]
+        else:
+            node = node.setdefault(segment, child)
+    if isinstance(node, list):
+        node.append(value)
+    else:
+        node[path[-1]] = value
+
+
+def _questions(rng, text_length):
+    document = {}
+    for spec in SITE_SCHEMA:
+        _set_path(document, spec.path, _answer(rng, spec, text_length))
+    _set_path(document, AUDIT_DATE_PATH, f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+    return get_path(document, split_path(QUESTIONS))
+
+
+def _nested(rng, depth, text_length):
+    node = {'value': _text(rng, text_length)}
+    for level in range(depth):
+        node = {f'level{level}': node, 'items': [{'id': level}]}
+    return node
+
+
+def requirement_uuids(n_requirements):
+    """Return the UUIDs used for the generated requirements."""
+    return [f'00000000-0000-4000-8000-{i:012d}' for i in range(n_requirements)]
+
+
+def make_uuid_mapping(n_requirements=250, chapters=6, themes_per_chapter=4):
+    """Return a UUID mapping DataFrame (UUID, Num, Chapitre, Theme, SSTheme) for the generated requirements."""
+    import pandas as pd
+
+    rows = []
+    for i, uuid in enumerate(requirement_uuids(n_requirements)):
+        chapter = i % chapters + 1
+        theme = i // chapters % themes_per_chapter
+        num = f"{chapter}.{theme}.{i // (chapters * themes_per_chapter) + 1}"
+        rows.append({
+            'UUID': uuid,
+            'Num': num + ('*' if i % 17 == 0 else ''),  # KO requirements are starred in the real file
+            'Chapitre': str(chapter),
+            'Theme': f"{chapter}.{theme}",
+            'SSTheme': num,
+        })
+    return pd.DataFrame(rows)
+
+
+def make_document(n_requirements=250, text_length=200, nesting_depth=0, extra_sections=0, seed=0):
+    """Return a synthetic document shaped like a food_8 NEO export.
+
+    extra_sections adds unrelated payload (one text of text_length per
+    section) that the extraction never reads, like attachments in real files.
+    """
+    rng = random.Random(seed)
+    result_scorings = {}
+    for uuid in requirement_uuids(n_requirements):
+        label = rng.choice(SCORE_LABELS)
+        result_scorings[uuid] = {
+            'score': {'label': label, 'value': SCORE_LABELS.index(label)},
+            'answers': {
+                'explanationText': _text(rng, text_length),
+                'englishExplanationText': _text(rng, text_length),
+                'fieldAnswers': rng.choice(['Oui', 'Non', '']),
+            },
+            'isCorrectionRequired': label in ('C', 'D', 'MAJOR', 'KO'),
+        }
+        if nesting_depth:
+            result_scorings[uuid]['details'] = _nested(rng, nesting_depth, 20)
+    matrix_result = [
+        {'type': 'chapter', 'levelId': 'higher', 'chapterId': str(i % 6 + 1),
+         'scoreId': rng.choice(SCORE_LABELS), 'count': rng.randint(0, 20)}
+        for i in range(max(n_requirements // 4, 1))
+    ]
+    food_8 = {
+        'questions': _questions(rng, text_length),
+        'checklists': {'checklistFood8': {'resultScorings': result_scorings}},
+        'result': {'overall': {'level': 'higher', 'passed': True, 'percent': round(rng.uniform(75, 100), 2)}},
+        'matrixResult': matrix_result,
+    }
+    extra = {f'section{i}': {'content': _text(rng, text_length)} for i in range(extra_sections)}
+    return {'data': {'modules': {'food_8': food_8}, 'attachments': extra}}
+
+
+def write_document(path, **kwargs):
+    """Write a synthetic document to path and return its size in bytes."""
+    data = json.dumps(make_document(**kwargs), ensure_ascii=False).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(data)
+    return len(data)
@@ -0,0 +1,47 @@
+"""Streamlit-free extraction library for IFS NEO (.ifs) audit files."""
+from ifsneo.extraction import (
+    MISSING,
+    checklist_table,
+    compact_requirements,
+    extract_from_document,
+    extract_from_flattened,
+    flatten_json_safe,
+    iter_flatten,
+    result_scorings_frame,
+    write_flattened_csv,
+)
+from ifsneo.matrix import NON_CONFORMITY_SCORES, MatrixIndex
+from ifsneo.memo import DocumentCache, session_document_cache
+from ifsneo.modules import (
+    NeoModule,
+    UnsupportedModuleError,
+    detect_module,
+    document_modules,
+    document_prefixes,
+    get_module,
+    register_module,
+    registered_modules,
+)
+from ifsneo.parsing import load_document
+from ifsneo.paths import compile_accessor, compile_mapping, get_path, resolve_flat_key, split_path
+from ifsneo.schema import FieldIssue, FieldSchema, FieldSpec, SchemaError
+from ifsneo.filters import ALL, HierarchyIndex
+from ifsneo.refstore import (
+    get_checklist,
+    get_checklist_index,
+    get_checklist_with_index,
+    get_reference,
+    get_reference_index,
+    get_reference_with_index,
+    get_uuid_mapping,
+    get_uuid_mapping_index,
+    get_uuid_mapping_with_index,
+    prefetch_references,
+)
+from ifsneo.reference import (
+    CHECKLIST_URL,
+    UUID_MAPPING_URL,
+    ReferenceDataError,
+    load_checklist,
+    load_uuid_mapping_from_url,
+)
@@ -0,0 +1,5 @@
+import sys
+
+from ifsneo.cli import main
+
+sys.exit(main())
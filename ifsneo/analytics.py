@@ -0,0 +1,61 @@
+# Cross-audit analytics computed from the aggregates of the audit store.
+# The store keeps per-requirement and per-audit score counts up to date as
+# audits are ingested, so these functions only reshape a few hundred rows,
+# whatever the number of audits.
+from ifsneo.matrix import NON_CONFORMITY_SCORES
+
+# Order of the score columns in the tables
+SCORE_ORDER = ['A', 'B', 'C', 'D', 'MAJOR', 'KO', 'NA', 'N/A']
+
+
+def _score_columns(df):
+    known = [score for score in SCORE_ORDER if score in df.columns]
+    return df[known + sorted(column for column in df.columns if column not in SCORE_ORDER)]
+
+
+def score_distribution(store, uuid_mapping_df, level='Chapitre'):
+    """Number of scorings per value of level (Chapitre, Theme, SSTheme) and score."""
+    import pandas as pd
+
+    counts = pd.DataFrame(store.requirement_score_counts(), columns=['uuid', 'num', 'score', 'audits'])
+    levels = uuid_mapping_df[['UUID', level]].astype({'UUID': str}).drop_duplicates('UUID')
+    merged = counts.merge(levels, left_on='uuid', right_on='UUID', how='inner')
+    table = _score_columns(merged.pivot_table(index=level, columns='score', values='audits', aggfunc='sum', fill_value=0))
+    table.columns.name = None
+    return table
+
+
+def top_non_conformities(store, uuid_mapping_df=None, scores=NON_CONFORMITY_SCORES, limit=20):
+    """Requirements most often scored with one of scores, with the number of audits per score."""
+    import pandas as pd
+
+    counts = pd.DataFrame(store.requirement_score_counts(scores), columns=['uuid', 'num', 'score', 'audits'])
+    if counts.empty:
+        return pd.DataFrame(columns=['Num', 'UUID', 'Total'])
+    table = counts.pivot_table(index=['num', 'uuid'], columns='score', values='audits', aggfunc='sum', fill_value=0)
+    table = _score_columns(table)
+    table['Total'] = table.sum(axis=1)
+    table = table.sort_values('Total', ascending=False, kind='stable').head(limit).reset_index()
+    table = table.rename(columns={'num': 'Num', 'uuid': 'UUID'})
+    if uuid_mapping_df is not None and 'Theme' in uuid_mapping_df:
+        themes = uuid_mapping_df[['UUID', 'Chapitre', 'Theme']].astype({'UUID': str}).drop_duplicates('UUID')
+        table = table.merge(themes, on='UUID', how='left')
+    table.columns.name = None
+    return table
+
+
+def site_trend(store, coid):
+    """Score counts of each audit of a site, one row per audit in date order."""
+    import pandas as pd
+
+    rows = pd.DataFrame(store.audit_score_counts(coid),
+                        columns=['audit_id', 'coid', 'audit_date', 'source', 'score', 'requirements'])
+    if rows.empty:
+        return pd.DataFrame()
+    rows['audit_date'] = rows['audit_date'].fillna('')
+    table = rows.pivot_table(index=['audit_date', 'audit_id', 'source'], columns='score',
+                             values='requirements', aggfunc='sum', fill_value=0)
+    table = _score_columns(table)
+    table['Non-conformités'] = table[[score for score in NON_CONFORMITY_SCORES if score in table.columns]].sum(axis=1)
+    table.columns.name = None
+    return table.reset_index(level=['audit_id', 'source'])
@@ -0,0 +1,280 @@
+"""Bulk extraction of many .ifs audits in parallel.
+
+Each file is parsed and extracted in a worker process; a file that fails is
+reported with its error and does not stop the batch.
+
+    python -m ifsneo.batch audits/ saison2024.zip -o consolidation.xlsx
+    python -m ifsneo.batch audits/ --export-dir entrepot/ --export-format csv
+"""
+import hashlib
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from ifsneo.columnar import EXPORT_FORMATS, export_results, parquet_available
+from ifsneo.exports import excel_engine
+from ifsneo.extraction import compact_requirements, extract_from_document
+from ifsneo.modules import detect_module
+from ifsneo.parsing import load_document
+from ifsneo.schema import FieldSchema
+from ifsneo.timing import timed
+
+COID_LABEL = "N° COID du portail"
+
+# Worker processes of a batch when max_workers is not given: batches run
+# inside the Streamlit server, next to the interactive sessions
+MAX_WORKERS = 4
+
+
+# Result of the extraction of one audit file
+@dataclass
+class AuditResult:
+    name: str
+    module: str = None  # NEO module of the audit, e.g. food_8
+    coid: object = None
+    fields: dict = field(default_factory=dict)
+    requirements: object = None  # DataFrame returned by checklist_table()
+    seconds: float = 0.0
+    error: str = None
+    digest: str = None  # SHA-256 of the file content
+    audit_date: object = None
+    warnings: list = field(default_factory=list)  # Fields of the schema not found as declared
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+# Expand folders and zip archives into (name, path or bytes) sources
+def iter_sources(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for filename in sorted(files):
+                    if filename.lower().endswith('.ifs'):
+                        file_path = os.path.join(root, filename)
+                        yield os.path.relpath(file_path, path), file_path
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.namelist():
+                    if member.lower().endswith('.ifs'):
+                        yield member, archive.read(member)
+        else:
+            yield os.path.basename(path), path
+
+
+# Turn uploaded files (objects with name and getvalue(), e.g. Streamlit uploads)
+# into (name, bytes) sources, expanding zip archives
+def uploaded_sources(uploaded_files):
+    sources = []
+    for uploaded_file in uploaded_files:
+        content = uploaded_file.getvalue()
+        if uploaded_file.name.lower().endswith('.zip'):
+            with zipfile.ZipFile(BytesIO(content)) as archive:
+                for member in archive.namelist():
+                    if member.lower().endswith('.ifs'):
+                        sources.append((member, archive.read(member)))
+        else:
+            sources.append((uploaded_file.name, content))
+    return sources
+
+
+def content_digest(source):
+    """SHA-256 of a source (path or bytes), reading files in blocks."""
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _describe_error(error):
+    # Parser messages span several lines; keep them on one line for the report
+    return f"{type(error).__name__}: {' '.join(str(error).split())}"
+
+
+def _module_requirements(module, uuid_mapping_df):
+    # A DataFrame applies to every module, a dict gives one per module name,
+    # None reads the reference file of the module from the local store
+    if isinstance(uuid_mapping_df, dict):
+        return uuid_mapping_df.get(module.name)
+    if uuid_mapping_df is None and module.requirements_reference:
+        from ifsneo.refstore import get_reference
+
+        return get_reference(module.requirements_reference)[['Num', 'UUID']]
+    return uuid_mapping_df
+
+
+def audit_result(name, document, uuid_mapping_df=None, mapping=None, digest=None):
+    """AuditResult of an already parsed document.
+
+    The NEO module of the document (see ifsneo.modules) gives the field
+    schema, unless mapping is given, and the location of the checklist.
+    """
+    module = detect_module(document)
+    if mapping is None:
+        mapping = module.site_schema
+    fields = extract_from_document(document, mapping)
+    warnings = []
+    if isinstance(mapping, FieldSchema):
+        # Unanswered questions are expected; missing or mistyped fields point to mapping drift
+        warnings = [str(issue) for issue in mapping.check(document) if issue.problem != 'unanswered']
+    return AuditResult(
+        name=name,
+        module=module.name,
+        coid=fields.get(COID_LABEL),
+        fields=fields,
+        requirements=module.checklist_table(document, _module_requirements(module, uuid_mapping_df)),
+        digest=digest,
+        audit_date=module.audit_date(document),
+        warnings=warnings
+    )
+
+
+def extract_audit(name, source, uuid_mapping_df=None, mapping=None):
+    """Extract one audit; source is a path or the file content as bytes."""
+    start = time.perf_counter()
+    try:
+        digest = content_digest(source)
+        if isinstance(source, bytes):
+            document = load_document(BytesIO(source))
+        else:
+            with open(source, 'rb') as f:
+                document = load_document(f)
+        result = audit_result(name, document, uuid_mapping_df, mapping, digest)
+    except Exception as e:  # One bad file must not abort the batch
+        return AuditResult(name=name, seconds=time.perf_counter() - start, error=_describe_error(e))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _worker_context():
+    # Forking the multi-threaded Streamlit server would copy the locks held by
+    # other threads (reference store, label dtypes) into the workers, where
+    # nothing would ever release them: start the workers from a fresh process
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+@timed('batch extraction')
+def extract_batch(sources, uuid_mapping_df=None, mapping=None, max_workers=None, progress=None):
+    """Extract every (name, source) pair and return the AuditResults in input order.
+
+    uuid_mapping_df gives the requirements to extract (its Num and UUID
+    columns): one DataFrame for every file, a {module name: DataFrame}
+    dict for batches mixing NEO modules, or None to use the reference file
+    of each module. max_workers defaults to MAX_WORKERS (and never exceeds
+    the CPU or file count); with max_workers=1 everything runs in the current process.
+    progress(done, total) is called after each file; an exception it raises
+    stops the batch without extracting the remaining files.
+    """
+    sources = list(sources)
+    # Only these columns are needed, which keeps what is sent to the workers small
+    if isinstance(uuid_mapping_df, dict):
+        requirements = {name: df[['Num', 'UUID']] for name, df in uuid_mapping_df.items()}
+    elif uuid_mapping_df is not None:
+        requirements = uuid_mapping_df[['Num', 'UUID']]
+    else:
+        requirements = None
+    results = []
+    workers = min(max_workers or MAX_WORKERS, os.cpu_count() or 1, len(sources))
+    if workers <= 1:
+        for name, source in sources:
+            results.append(extract_audit(name, source, requirements, mapping))
+            if progress is not None:
+                progress(len(results), len(sources))
+        return results
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_worker_context()) as executor:
+        futures = [executor.submit(extract_audit, name, source, requirements, mapping) for name, source in sources]
+        try:
+            for (name, _), future in zip(sources, futures):
+                try:
+                    result = future.result()
+                    if result.ok:
+                        # Unpickled tables each hold a copy of their labels: share them again
+                        compact_requirements(result.requirements)
+                    results.append(result)
+                except Exception as e:  # e.g. a worker killed by the OOM killer
+                    results.append(AuditResult(name=name, error=_describe_error(e)))
+                if progress is not None:
+                    progress(len(results), len(sources))
+        except BaseException:
+            # Stopped (e.g. a cancelled job): drop the files not started yet
+            executor.shutdown(cancel_futures=True)
+            raise
+        return results
+
+
+# Build the consolidated tables of a batch
+def batch_to_frames(results):
+    """Return (sites, requirements, report) DataFrames keyed by COID."""
+    import pandas as pd
+
+    sites = pd.DataFrame([
+        {"COID": result.coid, "Fichier": result.name, **result.fields}
+        for result in results if result.ok
+    ])
+    tables = []
+    for result in results:
+        if result.ok:
+            table = result.requirements.copy()
+            table.insert(0, "Fichier", result.name)
+            table.insert(0, "COID", result.coid)
+            tables.append(table)
+    requirements = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+    report = pd.DataFrame([
+        {"Fichier": result.name, "Module": result.module, "COID": result.coid, "Durée (s)": round(result.seconds, 3),
+         "Statut": "OK" if result.ok else "Erreur", "Erreur": result.error or "",
+         "Avertissements": "; ".join(result.warnings)}
+        for result in results
+    ])
+    return sites, requirements, report
+
+
+# Write the consolidated workbook of a batch
+@timed('excel batch')
+def write_batch_workbook(results, output):
+    """Write the "Sites", "Exigences" and "Rapport" sheets to output (path or file object)."""
+    import pandas as pd
+
+    sites, requirements, report = batch_to_frames(results)
+    with pd.ExcelWriter(output, engine=excel_engine()) as writer:
+        sites.to_excel(writer, index=False, sheet_name="Sites")
+        requirements.to_excel(writer, index=False, sheet_name="Exigences")
+        report.to_excel(writer, index=False, sheet_name="Rapport")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m ifsneo.batch', description="Extraction of many .ifs audits")
+    parser.add_argument('inputs', nargs='+', help=".ifs files, folders or zip archives")
+    parser.add_argument('-o', '--output', default='consolidation.xlsx', help="workbook to write")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="number of worker processes")
+    parser.add_argument('--export-dir', help="also append the results to the columnar tables in this folder")
+    parser.add_argument('--export-format', choices=EXPORT_FORMATS, default='parquet', help="format of the columnar tables")
+    args = parser.parse_args(argv)
+    if args.export_dir and args.export_format == 'parquet' and not parquet_available():
+        parser.error("--export-format parquet needs pyarrow (pip install pyarrow); use --export-format csv")
+
+    results = extract_batch(iter_sources(args.inputs), max_workers=args.workers)
+    for result in results:
+        status = "ok" if result.ok else f"ERREUR {result.error}"
+        print(f"{result.name}\t{result.coid}\t{result.seconds:.3f}s\t{status}")
+    write_batch_workbook(results, args.output)
+    failures = sum(1 for result in results if not result.ok)
+    print(f"{len(results) - failures}/{len(results)} fichiers extraits dans {args.output}")
+    if args.export_dir:
+        counts = export_results(results, args.export_dir, args.export_format)
+        print(f"{counts['sites']} champs et {counts['requirements']} exigences ajoutés dans {args.export_dir}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,243 @@
+"""Command line interface, for pipelines that run without a Streamlit server.
+
+    python -m ifsneo extract audit.ifs --format csv > sites.csv
+    python -m ifsneo extract *.ifs --fields "Nom du site à auditer" "Pays" --format xlsx -o sites.xlsx
+    python -m ifsneo checklist audit.ifs --chapitre 4 -o checklist.xlsx
+    python -m ifsneo batch audits/ -o consolidation.xlsx
+    python -m ifsneo store ingest audits/
+    python -m ifsneo validate audit.ifs
+    python -m ifsneo diff audit2023.ifs audit2024.ifs -o comparaison.xlsx
+
+json and csv outputs only need the standard library, so pandas is imported
+for xlsx / parquet exports and checklist commands only.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+FORMATS = ['json', 'csv', 'xlsx', 'parquet']
+
+# Formats written as binary files, which cannot go to stdout
+BINARY_FORMATS = ['xlsx', 'parquet']
+
+
+def _requested_format(args):
+    """Return the format requested by --format, or guessed from the output file name, or None."""
+    fmt = args.format
+    if fmt is None and args.output:
+        extension = os.path.splitext(args.output)[1].lstrip('.').lower()
+        if extension in FORMATS:
+            fmt = extension
+    return fmt
+
+
+def _output_format(args, default):
+    """Return the format requested by --format, or guessed from the output file name, or default."""
+    fmt = _requested_format(args) or default
+    if fmt in BINARY_FORMATS and not args.output:
+        raise ValueError(f"--output is required for the {fmt} format")
+    return fmt
+
+
+def _write_rows(rows, columns, fmt, output, sheet_name):
+    if fmt == 'json':
+        with _open_text(output) as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2, default=str)
+            f.write('\n')
+    elif fmt == 'csv':
+        with _open_text(output) as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        import pandas as pd
+
+        df = pd.DataFrame(rows, columns=columns)
+        if fmt == 'xlsx':
+            from ifsneo.exports import excel_engine
+
+            df.to_excel(output, index=False, sheet_name=sheet_name, engine=excel_engine())
+        else:
+            df.to_parquet(output, index=False)
+
+
+@contextmanager
+def _open_text(output):
+    """Open output for writing, or use stdout when output is None."""
+    if output is None:
+        yield sys.stdout
+        return
+    with open(output, 'w', encoding='utf-8', newline='') as f:
+        yield f
+
+
+def _load(path):
+    from ifsneo.parsing import load_document
+
+    with open(path, 'rb') as f:
+        return load_document(f)
+
+
+def cmd_extract(args):
+    from ifsneo.extraction import extract_from_document
+    from ifsneo.mapping import SITE_SCHEMA
+
+    if args.list_fields:
+        for label in SITE_SCHEMA.labels:
+            print(label)
+        return 0
+    if not args.inputs:
+        print("error: no input file", file=sys.stderr)
+        return 2
+    selected_fields = args.fields or SITE_SCHEMA.labels
+    unknown = [label for label in selected_fields if label not in SITE_SCHEMA]
+    if unknown:
+        print(f"error: unknown field(s): {', '.join(unknown)} (see --list-fields)", file=sys.stderr)
+        return 2
+
+    fmt = _output_format(args, 'json')
+    rows = []
+    failures = 0
+    for path in args.inputs:
+        # An unreadable file is reported and skipped, the others are still written
+        try:
+            document = _load(path)
+        except (OSError, ValueError) as e:
+            print(f"error: {path}: {' '.join(str(e).split())}", file=sys.stderr)
+            failures += 1
+            continue
+        extracted_data = extract_from_document(document, SITE_SCHEMA, selected_fields)
+        rows.append({"Fichier": os.path.basename(path), **extracted_data})
+    columns = ["Fichier"] + [label for label in SITE_SCHEMA.labels if label in selected_fields]
+    _write_rows(rows, columns, fmt, args.output, "Données extraites")
+    return 1 if failures else 0
+
+
+def cmd_checklist(args):
+    from ifsneo.exports import CHECKLIST_COLUMNS, checklist_frame, write_checklist_workbook
+    from ifsneo.extraction import checklist_table
+    from ifsneo.refstore import get_uuid_mapping
+
+    fmt = _output_format(args, 'xlsx')
+    filtered_df = get_uuid_mapping()
+    for column, value in (('Chapitre', args.chapitre), ('Theme', args.theme), ('SSTheme', args.sstheme)):
+        if value is not None:
+            filtered_df = filtered_df[filtered_df[column] == value]
+    df = checklist_frame(checklist_table(_load(args.input), filtered_df))
+
+    if fmt == 'xlsx':
+        write_checklist_workbook(df, args.output)
+    else:
+        rows = df.to_dict('records')
+        _write_rows(rows, CHECKLIST_COLUMNS, fmt, args.output, "Exigences de la checklist")
+    return 0
+
+
+def cmd_validate(args):
+    from ifsneo.mapping import REPORT_SCHEMA, SITE_SCHEMA
+
+    schema = REPORT_SCHEMA if args.schema == 'report' else SITE_SCHEMA
+    drift = 0
+    for path in args.inputs:
+        issues = schema.check(_load(path))
+        if not args.all:
+            issues = [issue for issue in issues if issue.problem != 'unanswered']
+        drift += sum(1 for issue in issues if issue.problem in ('missing', 'not a value'))
+        for issue in issues:
+            print(f"{os.path.basename(path)}\t{issue.problem}\t{issue}")
+    return 1 if drift else 0
+
+
+def cmd_diff(args):
+    from ifsneo.diff import diff_documents, write_diff_workbook
+    from ifsneo.refstore import get_uuid_mapping
+
+    fmt = _output_format(args, 'json')
+    if fmt not in ('json', 'xlsx'):
+        raise ValueError(f"the diff can be written as json or xlsx, not {fmt}")
+    diff = diff_documents(_load(args.before), _load(args.after), get_uuid_mapping())
+    if fmt == 'xlsx':
+        write_diff_workbook(diff, args.output)
+    else:
+        with _open_text(args.output) as f:
+            json.dump({
+                'site_changes': [vars(change) for change in diff.site_changes],
+                'requirement_changes': [dict(vars(change), change=change.kind) for change in diff.requirement_changes],
+            }, f, ensure_ascii=False, indent=2, default=str)
+            f.write('\n')
+    return 0
+
+
+# Subcommands with their own command line: {command: module whose main(argv) runs it}
+DELEGATED_COMMANDS = {'batch': 'ifsneo.batch', 'store': 'ifsneo.store'}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m ifsneo', description="IFS NEO (.ifs) extractor")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    extract_parser = subparsers.add_parser('extract', help="extract the site data (one row per file)")
+    extract_parser.add_argument('inputs', nargs='*', help=".ifs files")
+    extract_parser.add_argument('--fields', nargs='+', action='extend', metavar='LABEL', help="fields to extract (default: all)")
+    extract_parser.add_argument('--list-fields', action='store_true', help="print the available fields and exit")
+    extract_parser.add_argument('--format', choices=FORMATS, help="output format (default: from -o, else json)")
+    extract_parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    extract_parser.set_defaults(func=cmd_extract, columnar=True)
+
+    checklist_parser = subparsers.add_parser('checklist', help="export the checklist requirements")
+    checklist_parser.add_argument('input', help=".ifs file")
+    checklist_parser.add_argument('--chapitre', help="keep a single chapter")
+    checklist_parser.add_argument('--theme', help="keep a single theme")
+    checklist_parser.add_argument('--sstheme', help="keep a single sub-theme")
+    checklist_parser.add_argument('--format', choices=FORMATS, help="output format (default: from -o, else xlsx)")
+    checklist_parser.add_argument('-o', '--output', help="output file (default: stdout for json/csv)")
+    checklist_parser.set_defaults(func=cmd_checklist, columnar=True)
+
+    validate_parser = subparsers.add_parser('validate', help="check the field schema against sample documents")
+    validate_parser.add_argument('inputs', nargs='+', help=".ifs files")
+    validate_parser.add_argument('--schema', choices=['site', 'report'], default='site', help="schema to check (default: site)")
+    validate_parser.add_argument('--all', action='store_true', help="also list the unanswered questions")
+    validate_parser.set_defaults(func=cmd_validate)
+
+    diff_parser = subparsers.add_parser('diff', help="compare two audits of the same site")
+    diff_parser.add_argument('before', help="earlier .ifs file")
+    diff_parser.add_argument('after', help="later .ifs file")
+    diff_parser.add_argument('--format', choices=['json', 'xlsx'], help="output format (default: from -o, else json)")
+    diff_parser.add_argument('-o', '--output', help="output file (default: stdout for json)")
+    diff_parser.set_defaults(func=cmd_diff)
+
+    # Listed in the help only: main() hands their arguments to their own parser
+    subparsers.add_parser('batch', help="parallel extraction of many audits (see python -m ifsneo batch -h)")
+    subparsers.add_parser('store', help="persistent store of audits (see python -m ifsneo store -h)")
+    return parser
+
+
+def main(argv=None):
+    import importlib
+
+    from ifsneo.reference import ReferenceDataError
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    try:
+        if argv and argv[0] in DELEGATED_COMMANDS:
+            return importlib.import_module(DELEGATED_COMMANDS[argv[0]]).main(argv[1:])
+        parser = build_parser()
+        args = parser.parse_args(argv)
+        if getattr(args, 'columnar', False) and _requested_format(args) == 'parquet':
+            from ifsneo.columnar import parquet_available
+
+            if not parquet_available():
+                parser.error("the parquet format needs pyarrow (pip install pyarrow); use --format csv")
+        return args.func(args)
+    except BrokenPipeError:
+        return 0
+    except (OSError, ValueError, ReferenceDataError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Columnar exports (Parquet dataset or CSV) of batch extraction results.
+
+Two tables are written, each with a fixed schema so that successive exports
+can be appended to the same place and queried together:
+
+- sites: one row per (audit, field), in long format, so adding a field to
+  the mapping does not change the columns;
+- requirements: one row per (audit, requirement) with its scoring.
+
+Every column is a string; values missing from the audit ('N/A') are written
+as nulls (empty cells in CSV). Rows are written in chunks, so a large batch
+is never materialized as a single DataFrame.
+
+    python -m ifsneo.batch audits/ --export-dir entrepot/ --export-format parquet
+
+Parquet needs pyarrow; CSV only needs the standard library.
+"""
+import csv
+import io
+import os
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+
+from ifsneo.extraction import MISSING
+from ifsneo.timing import timed
+
+SITE_COLUMNS = ['coid', 'source', 'exported_at', 'field', 'value']
+REQUIREMENT_COLUMNS = [
+    'coid', 'source', 'exported_at', 'num', 'uuid',
+    'explanation', 'detailed_explanation', 'score', 'response'
+]
+TABLES = {'sites': SITE_COLUMNS, 'requirements': REQUIREMENT_COLUMNS}
+
+# Columns of the checklist_table() DataFrame, in REQUIREMENT_COLUMNS order
+_REQUIREMENT_SOURCE_COLUMNS = ['Num', 'UUID', 'Explanation', 'Detailed Explanation', 'Score', 'Response']
+
+EXPORT_FORMATS = ['parquet', 'csv']
+CHUNK_SIZE = 10000
+
+
+def _text(value):
+    if value is None or value == MISSING or value != value:  # NaN is the only value not equal to itself
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def site_rows(result, exported_at):
+    """Rows of the sites table for one AuditResult."""
+    coid, source = _text(result.coid), result.name
+    for label, value in result.fields.items():
+        yield {'coid': coid, 'source': source, 'exported_at': exported_at, 'field': label, 'value': _text(value)}
+
+
+def requirement_rows(result, exported_at):
+    """Rows of the requirements table for one AuditResult."""
+    coid, source = _text(result.coid), result.name
+    table = result.requirements[_REQUIREMENT_SOURCE_COLUMNS]
+    for values in table.itertuples(index=False, name=None):
+        row = {'coid': coid, 'source': source, 'exported_at': exported_at}
+        row.update(zip(REQUIREMENT_COLUMNS[3:], map(_text, values)))
+        yield row
+
+
+def _chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def append_csv(path, columns, rows, chunk_size=CHUNK_SIZE):
+    """Append rows to the CSV file path, writing the header if the file is new.
+
+    Raises ValueError if the file exists with other columns. Returns the
+    number of rows written.
+    """
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, encoding='utf-8', newline='') as f:
+            header = next(csv.reader(f), [])
+        if header != columns:
+            raise ValueError(f"{path} has the columns {header}, expected {columns}")
+        new_file = False
+    else:
+        new_file = True
+
+    count = 0
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        if new_file:
+            writer.writeheader()
+        for chunk in _chunks(rows, chunk_size):
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("the parquet format needs pyarrow (pip install pyarrow), or use the csv format") from None
+    return pyarrow
+
+
+def parquet_available():
+    """True if pyarrow is installed."""
+    try:
+        _pyarrow()
+    except ImportError:
+        return False
+    return True
+
+
+def arrow_schema(columns):
+    """Arrow schema of a table: every column is a nullable string."""
+    pa = _pyarrow()
+    return pa.schema([(column, pa.string()) for column in columns])
+
+
+def write_parquet(output, columns, rows, chunk_size=CHUNK_SIZE):
+    """Write rows to a Parquet file (path or file object), one row group per chunk.
+
+    Returns the number of rows written.
+    """
+    pa = _pyarrow()
+    schema = arrow_schema(columns)
+    count = 0
+    with pa.parquet.ParquetWriter(output, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def append_parquet(directory, columns, rows, chunk_size=CHUNK_SIZE):
+    """Add rows to the Parquet dataset directory as a new part file.
+
+    Parquet files cannot be appended to, so each export adds a part file;
+    readers (pyarrow.dataset, DuckDB, pandas) load the directory as one table.
+    Returns the number of rows written.
+    """
+    _pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    part = os.path.join(directory, f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet")
+    try:
+        count = write_parquet(part, columns, rows, chunk_size)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    if not count:  # Keep the dataset free of empty parts
+        os.remove(part)
+    return count
+
+
+def table_rows(results, exported_at=None):
+    """{table name: row generator} for the successful AuditResults."""
+    exported_at = exported_at or datetime.now(timezone.utc).isoformat(timespec='seconds')
+    results = [result for result in results if result.ok]
+    return {
+        'sites': (row for result in results for row in site_rows(result, exported_at)),
+        'requirements': (row for result in results for row in requirement_rows(result, exported_at)),
+    }
+
+
+@timed('columnar export')
+def write_table(results, name, output, fmt='parquet', chunk_size=CHUNK_SIZE):
+    """Write one table ('sites' or 'requirements') of the AuditResults to the binary file object output."""
+    rows = table_rows(results)[name]
+    if fmt == 'parquet':
+        return write_parquet(output, TABLES[name], rows, chunk_size)
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    writer = csv.DictWriter(text, fieldnames=TABLES[name])
+    writer.writeheader()
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows(chunk)
+        count += len(chunk)
+    text.detach()  # Flush without closing output
+    return count
+
+
+def export_results(results, directory, fmt='parquet', chunk_size=CHUNK_SIZE):
+    """Append the successful AuditResults to the sites and requirements tables in directory.
+
+    With the parquet format each table is a dataset directory
+    (directory/sites/, directory/requirements/); with csv it is a single
+    file (directory/sites.csv, directory/requirements.csv).
+    Returns {table name: number of rows written}.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r} (expected one of {', '.join(EXPORT_FORMATS)})")
+    if fmt == 'parquet':
+        _pyarrow()  # Fail before writing anything
+    os.makedirs(directory, exist_ok=True)
+
+    counts = {}
+    for name, rows in table_rows(results).items():
+        if fmt == 'parquet':
+            counts[name] = append_parquet(os.path.join(directory, name), TABLES[name], rows, chunk_size)
+        else:
+            counts[name] = append_csv(os.path.join(directory, f"{name}.csv"), TABLES[name], rows, chunk_size)
+    return counts
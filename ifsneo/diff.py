@@ -0,0 +1,252 @@
+"""Comparison of two audits of the same site (e.g. this year's and last year's).
+
+The site fields are aligned by label and the requirements by UUID. Each
+scoring of the checklist, the checklist as a whole and the part of the
+document holding the site fields are hashed; sections whose digest did not
+change are skipped, and only the scorings whose digest differs are read
+and compared.
+
+    before, after = load_document(...), load_document(...)
+    diff = diff_documents(before, after, uuid_mapping_df)
+    diff.score_changes, diff.new_non_conformities, diff.site_changes
+
+The digests of a document can be computed once with document_digests()
+(e.g. kept in the CachedDocument of an upload) and passed to
+diff_documents().
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+from ifsneo.extraction import MISSING, extract_from_document
+from ifsneo.matrix import NON_CONFORMITY_SCORES
+from ifsneo.modules import detect_module
+from ifsneo.paths import get_leaf, get_path
+from ifsneo.schema import FieldSchema
+from ifsneo.timing import timed
+
+# Paths inside a scoring
+SCORE_PATH = ('score', 'label')
+TEXT_PATHS = (('answers', 'englishExplanationText'), ('answers', 'explanationText'), ('answers', 'fieldAnswers'))
+
+
+def _hash(data):
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def subtree_digest(node):
+    """Digest of a JSON value, independent of the order of the keys."""
+    return _hash(json.dumps(node, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str))
+
+
+def combine_digests(digests):
+    """Digest of a section from the {key: digest} of its children."""
+    return _hash('\n'.join(f"{key}:{digest}" for key, digest in sorted(digests.items())))
+
+
+def _common_prefix(paths):
+    paths = list(paths)
+    if not paths:
+        return ()
+    prefix = paths[0]
+    for path in paths[1:]:
+        length = 0
+        while length < min(len(prefix), len(path)) and prefix[length] == path[length]:
+            length += 1
+        prefix = prefix[:length]
+    return prefix
+
+
+# Digests of the parts of a document compared by diff_documents()
+@dataclass
+class DocumentDigests:
+    module: str
+    site: str  # Subtree holding every field of the schema (None for a {label: path} mapping)
+    checklist: str
+    scorings: dict  # {uuid: digest}
+
+
+def _site_root(schema):
+    # The deepest node containing every field, e.g. data.modules.food_8.questions
+    root = _common_prefix(spec.path for spec in schema)
+    return root[:-1] if any(len(spec.path) == len(root) for spec in schema) else root
+
+
+def document_digests(document, module=None, mapping=None):
+    """Return the DocumentDigests of document (mapping: the field schema compared, by default the module's)."""
+    if module is None:
+        module = detect_module(document)
+    if mapping is None:
+        mapping = module.site_schema
+    site = None
+    if isinstance(mapping, FieldSchema):
+        site = subtree_digest(get_path(document, _site_root(mapping), None))
+    scorings = get_path(document, module.checklist_path, {})
+    if not isinstance(scorings, dict):
+        scorings = {}
+    scoring_digests = {str(uuid): subtree_digest(scoring) for uuid, scoring in scorings.items()}
+    return DocumentDigests(module.name, site, combine_digests(scoring_digests), scoring_digests)
+
+
+# A site field whose value differs between the two audits
+@dataclass(frozen=True)
+class FieldChange:
+    label: str
+    before: object
+    after: object
+
+
+# A requirement whose scoring differs between the two audits
+@dataclass(frozen=True)
+class RequirementChange:
+    num: object
+    uuid: str
+    before: object  # Score label, MISSING when the requirement is not in the audit
+    after: object
+    text_changed: bool = False  # Explanations or answers edited
+
+    @property
+    def score_changed(self):
+        return self.before != self.after
+
+    @property
+    def new_non_conformity(self):
+        return self.after in NON_CONFORMITY_SCORES and self.before not in NON_CONFORMITY_SCORES
+
+    @property
+    def resolved_non_conformity(self):
+        return self.before in NON_CONFORMITY_SCORES and self.after not in NON_CONFORMITY_SCORES
+
+    @property
+    def kind(self):
+        if self.new_non_conformity:
+            return "Nouvelle non-conformité"
+        if self.resolved_non_conformity:
+            return "Non-conformité levée"
+        if self.score_changed:
+            return "Note modifiée"
+        return "Texte modifié"
+
+
+@dataclass
+class AuditDiff:
+    module: str
+    site_changes: list = field(default_factory=list)
+    requirement_changes: list = field(default_factory=list)
+    site_skipped: bool = False  # The site fields section was identical
+    compared_requirements: int = 0  # Scorings read because their digest differed
+    skipped_requirements: int = 0  # Scorings skipped because their digest was identical
+
+    @property
+    def unchanged(self):
+        return not self.site_changes and not self.requirement_changes
+
+    @property
+    def score_changes(self):
+        return [change for change in self.requirement_changes if change.score_changed]
+
+    @property
+    def new_non_conformities(self):
+        return [change for change in self.requirement_changes if change.new_non_conformity]
+
+    @property
+    def resolved_non_conformities(self):
+        return [change for change in self.requirement_changes if change.resolved_non_conformity]
+
+
+def _diff_site(before, after, mapping, before_digests, after_digests):
+    if before_digests.site is not None and before_digests.site == after_digests.site:
+        return [], True
+    before_fields = extract_from_document(before, mapping)
+    after_fields = extract_from_document(after, mapping)
+    return [
+        FieldChange(label, before_fields[label], value)
+        for label, value in after_fields.items()
+        if before_fields[label] != value
+    ], False
+
+
+def _scoring(document, module, uuid):
+    scorings = get_path(document, module.checklist_path, {})
+    scoring = scorings.get(uuid) if isinstance(scorings, dict) else None
+    return scoring if isinstance(scoring, dict) else None
+
+
+@timed('audit diff')
+def diff_documents(before, after, uuid_mapping_df=None, mapping=None, before_digests=None, after_digests=None):
+    """Return the AuditDiff between the documents before and after.
+
+    uuid_mapping_df (UUID, Num) restricts the requirements compared and gives
+    their numbers; without it every scoring is compared, with 'N/A' as Num.
+    mapping is the field schema (or {label: path} dict) compared, by default
+    the one of the NEO module; digests passed in must have been computed with it.
+    """
+    module = detect_module(after)
+    before_module = detect_module(before)
+    if before_module.name != module.name:
+        raise ValueError(f"the audits are of different NEO modules ({before_module.name} and {module.name})")
+    if mapping is None:
+        mapping = module.site_schema
+    if before_digests is None:
+        before_digests = document_digests(before, module, mapping)
+    if after_digests is None:
+        after_digests = document_digests(after, module, mapping)
+
+    result = AuditDiff(module.name)
+    result.site_changes, result.site_skipped = _diff_site(before, after, mapping, before_digests, after_digests)
+
+    if uuid_mapping_df is not None:
+        requirements = list(zip(uuid_mapping_df['UUID'].astype(str), uuid_mapping_df['Num']))
+    else:
+        uuids = list(after_digests.scorings) + [uuid for uuid in before_digests.scorings if uuid not in after_digests.scorings]
+        requirements = [(uuid, MISSING) for uuid in uuids]
+
+    if before_digests.checklist == after_digests.checklist:
+        result.skipped_requirements = len(requirements)
+        return result
+    for uuid, num in requirements:
+        before_digest = before_digests.scorings.get(uuid)
+        after_digest = after_digests.scorings.get(uuid)
+        if before_digest == after_digest:
+            result.skipped_requirements += 1
+            continue
+        result.compared_requirements += 1
+        before_scoring = _scoring(before, module, uuid)
+        after_scoring = _scoring(after, module, uuid)
+        before_score = get_leaf(before_scoring, SCORE_PATH, MISSING) if before_scoring is not None else MISSING
+        after_score = get_leaf(after_scoring, SCORE_PATH, MISSING) if after_scoring is not None else MISSING
+        # Whole values are compared: the field answers are lists or objects, not leaves
+        text_changed = any(
+            get_path(before_scoring or {}, path, MISSING) != get_path(after_scoring or {}, path, MISSING)
+            for path in TEXT_PATHS
+        )
+        if before_score != after_score or text_changed:
+            result.requirement_changes.append(RequirementChange(num, uuid, before_score, after_score, text_changed))
+    return result
+
+
+def diff_frames(diff):
+    """(site DataFrame, requirements DataFrame) of an AuditDiff, with the headers of the pages."""
+    import pandas as pd
+
+    site = pd.DataFrame(
+        [(change.label, change.before, change.after) for change in diff.site_changes],
+        columns=["Champ", "Avant", "Après"]
+    )
+    requirements = pd.DataFrame(
+        [(change.num, change.uuid, change.before, change.after, change.kind) for change in diff.requirement_changes],
+        columns=["Num", "UUID", "Note avant", "Note après", "Changement"]
+    )
+    return site, requirements
+
+
+def write_diff_workbook(diff, output):
+    """Write the "Données du site" and "Exigences" sheets of an AuditDiff to output (path or file object)."""
+    import pandas as pd
+
+    from ifsneo.exports import excel_engine
+
+    site, requirements = diff_frames(diff)
+    with pd.ExcelWriter(output, engine=excel_engine()) as writer:
+        site.to_excel(writer, index=False, sheet_name="Données du site")
+        requirements.to_excel(writer, index=False, sheet_name="Exigences")
@@ -0,0 +1,180 @@
+# Export of the extracted data (checklist and site data workbooks).
+# pandas and the Excel engines are imported by the functions that need them only.
+# When xlsxwriter is installed the workbooks are written row by row in
+# constant-memory mode with column formats declared once per sheet; otherwise
+# pandas and openpyxl are used.
+from ifsneo.timing import timed
+
+CHECKLIST_COLUMNS = ["Num", "Explanation", "Detailed Explanation", "Score", "Commentaire"]
+
+# Columns written with a width of 50 and wrapped text
+WRAPPED_COLUMNS = ['B', 'C', 'F']
+WRAPPED_WIDTH = 50
+
+# Rows written between two progress reports of the checklist workbook
+PROGRESS_ROWS = 500
+
+_XLSXWRITER_OPTIONS = {
+    # Auditor text is data: never turn it into formulas, links or numbers
+    'strings_to_formulas': False,
+    'strings_to_urls': False,
+    'strings_to_numbers': False,
+    'nan_inf_to_errors': True,
+}
+
+
+def excel_engine():
+    """Return the fastest Excel engine available for pandas.ExcelWriter."""
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        return 'openpyxl'
+    return 'xlsxwriter'
+
+
+# Convert the requirement table (see checklist_table) to the table exported to Excel
+def checklist_frame(table):
+    df = table[CHECKLIST_COLUMNS[:-1]].copy()
+    df["Commentaire"] = ""
+    # Ensure the 'Num' column is of type string
+    df['Num'] = df['Num'].astype(str)
+    return df
+
+
+# Masks selecting the rows of each sheet of the workbook
+def checklist_sheet_masks(df):
+    """Return {sheet name: boolean Series} for the main, CO, NA and "Plan d'action" sheets."""
+    import pandas as pd
+
+    return {
+        "Exigences de la checklist": pd.Series(True, index=df.index),
+        "CO": df['Num'].str.contains(r'\*', na=False, regex=True),
+        "NA": df['Score'] == "NA",
+        "Plan d'action": (df['Score'] != "A") & (df['Score'] != "NA")
+    }
+
+
+# Split the checklist into the sheets of the workbook
+def checklist_sheets(df):
+    """Return {sheet name: DataFrame} for the main, CO, NA and "Plan d'action" sheets."""
+    return {sheet_name: df[mask] for sheet_name, mask in checklist_sheet_masks(df).items()}
+
+
+def _no_progress(fraction, message=None):
+    pass
+
+
+def _cell(value):
+    # Missing values are left blank, as pandas does
+    if value is None or value != value:
+        return None
+    return value
+
+
+# Write the checklist workbook
+@timed('excel checklist')
+def write_checklist_workbook(df, output, progress=None):
+    """Write the checklist sheets to output (path or file object).
+
+    progress(fraction, message=None), if given, is called for each sheet and
+    every PROGRESS_ROWS rows with the fraction of the workbook written; an
+    exception it raises (e.g. JobCancelled) stops the writing.
+    """
+    progress = progress or _no_progress
+    if excel_engine() == 'openpyxl':
+        _write_checklist_workbook_openpyxl(df, output, progress)
+        return
+
+    import xlsxwriter
+
+    # Rows are written in order, so constant-memory mode can flush them as they go
+    workbook = xlsxwriter.Workbook(output, dict(_XLSXWRITER_OPTIONS, constant_memory=True))
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    wrap_format = workbook.add_format({'text_wrap': True})
+
+    masks = checklist_sheet_masks(df)
+    sheets = []
+    for sheet_name in masks:
+        progress(0.0, f"Feuille « {sheet_name} »")
+        worksheet = workbook.add_worksheet(sheet_name)
+        for col in WRAPPED_COLUMNS:
+            worksheet.set_column(f'{col}:{col}', WRAPPED_WIDTH, wrap_format)
+        worksheet.write_row(0, 0, list(df.columns), header_format)
+        sheets.append([worksheet, 1])
+
+    # Single pass over the rows, each one going to every sheet it belongs to
+    membership = zip(*(mask.tolist() for mask in masks.values()))
+    for number, (row, in_sheets) in enumerate(zip(df.itertuples(index=False, name=None), membership)):
+        if number % PROGRESS_ROWS == 0:
+            progress(0.9 * number / len(df), f"Ligne {number + 1} sur {len(df)}")
+        row = [_cell(value) for value in row]
+        for sheet, in_sheet in zip(sheets, in_sheets):
+            if in_sheet:
+                sheet[0].write_row(sheet[1], 0, row)
+                sheet[1] += 1
+    progress(0.9, "Compression du fichier")
+    workbook.close()
+    progress(1.0)
+
+
+def _write_checklist_workbook_openpyxl(df, output, progress=_no_progress):
+    import pandas as pd
+    from openpyxl.styles import Alignment
+
+    # One alignment object shared by every wrapped cell: openpyxl stores it once
+    wrap = Alignment(wrap_text=True)
+    sheets = checklist_sheets(df)
+    # Progress counts the cells formatted after each sheet is written
+    total = sum(len(sheet_df) + 1 for sheet_df in sheets.values()) * len(WRAPPED_COLUMNS)
+    done = 0
+    # Create Excel writer and adjust column widths
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for sheet_name, sheet_df in sheets.items():
+            progress(0.9 * done / total, f"Feuille « {sheet_name} »")
+            sheet_df.to_excel(writer, index=False, sheet_name=sheet_name)
+
+            # Access the worksheet to modify the formatting
+            worksheet = writer.sheets[sheet_name]
+            for col in WRAPPED_COLUMNS:
+                # The column style applies to the cells added later in Excel, the written cells need their own
+                worksheet.column_dimensions[col].width = WRAPPED_WIDTH
+                worksheet.column_dimensions[col].alignment = wrap
+                header = worksheet[f'{col}1']
+                header.alignment = Alignment(horizontal=header.alignment.horizontal, vertical=header.alignment.vertical, wrap_text=True)
+                for number, cell in enumerate(worksheet[col][1:]):
+                    if number % PROGRESS_ROWS == 0:
+                        progress(0.9 * (done + number) / total)
+                    cell.alignment = wrap
+                done += len(sheet_df) + 1
+        progress(0.9, "Compression du fichier")
+    progress(1.0)
+
+
+# Width of each column: longest value (header included) plus padding
+def column_widths(df, padding=5):
+    return [
+        max(len(str(column)), int(df[column].astype(str).str.len().max()) if len(df) else 0) + padding
+        for column in df.columns
+    ]
+
+
+# Write the site data workbook of the NEO extraction page
+@timed('excel site data')
+def write_site_data_workbook(df, output, sheet_name="Données extraites"):
+    """Write df to output with each column as wide as its longest entry."""
+    import pandas as pd
+
+    engine = excel_engine()
+    widths = column_widths(df)
+    engine_kwargs = {'options': _XLSXWRITER_OPTIONS} if engine == 'xlsxwriter' else {}
+    with pd.ExcelWriter(output, engine=engine, engine_kwargs=engine_kwargs) as writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+        worksheet = writer.sheets[sheet_name]
+        if engine == 'xlsxwriter':
+            for index, width in enumerate(widths):
+                worksheet.set_column(index, index, width)
+        else:
+            from openpyxl.utils import get_column_letter
+
+            for index, width in enumerate(widths):
+                worksheet.column_dimensions[get_column_letter(index + 1)].width = width
@@ -0,0 +1,234 @@
+# Extraction helpers for IFS NEO (.ifs) documents.
+# This module must stay free of Streamlit so it can be used from batch jobs.
+import csv
+import threading
+from collections import OrderedDict
+
+from ifsneo.paths import compile_mapping, get_leaf, get_path
+from ifsneo.schema import FieldSchema
+from ifsneo.timing import timed
+
+# Value returned when a field or scoring is missing from the document
+MISSING = 'N/A'
+
+# Columns of the requirement table holding a few distinct values repeated on many rows
+LABEL_COLUMNS = ['Num', 'UUID', 'Score', 'Response']
+
+# Categorical dtypes shared by the requirement tables: {(dtype, typed categories): CategoricalDtype}
+_label_dtypes = OrderedDict()
+# Num and UUID columns of the UUID mappings: {id(uuid_mapping_df): (uuid_mapping_df, {column: Categorical})}
+_mapping_labels = OrderedDict()
+_label_dtypes_lock = threading.Lock()
+LABEL_DTYPES_SIZE = 64
+MAPPING_LABELS_SIZE = 8
+
+
+# Function to walk the nested JSON structure and yield its leaves
+def iter_flatten(nested_json, parent_key='', sep='_', prefixes=None):
+    """Yield (flattened_key, value) pairs in document order.
+
+    Uses an explicit stack, so deep documents cannot hit the recursion limit.
+    When prefixes is given, only keys starting with one of them are yielded
+    and subtrees that cannot match are not visited.
+    """
+    if prefixes is not None:
+        prefixes = tuple(prefixes)
+    stack = [(parent_key, nested_json)]
+    while stack:
+        key, node = stack.pop()
+        if not isinstance(node, dict):
+            if prefixes is None or key.startswith(prefixes):
+                yield key, node
+            continue
+        children = []
+        for k, v in node.items():
+            new_key = f'{key}{sep}{k}' if key else k
+            if prefixes is not None and not _may_match(new_key, prefixes):
+                continue
+            if isinstance(v, list):
+                for i, item in enumerate(v):
+                    children.append((f'{new_key}{sep}{i}', item))
+            else:
+                children.append((new_key, v))
+        # Reversed so that the first child is popped first
+        children.reverse()
+        stack.extend(children)
+
+
+def _may_match(key, prefixes):
+    for prefix in prefixes:
+        if key.startswith(prefix) or prefix.startswith(key):
+            return True
+    return False
+
+
+# Function to flatten the nested JSON structure
+@timed('flatten')
+def flatten_json_safe(nested_json, parent_key='', sep='_', prefixes=None):
+    """Flatten a nested JSON dictionary, safely handling strings and primitives."""
+    flattened = {}
+    for key, value in iter_flatten(nested_json, parent_key, sep, prefixes):
+        flattened[key] = value
+    return flattened
+
+
+# Function to stream the flattened JSON to a CSV file
+def write_flattened_csv(nested_json, fp, sep='_', prefixes=None):
+    """Write one "Field,Value" row per leaf to the text file fp; return the row count."""
+    writer = csv.writer(fp)
+    writer.writerow(["Field", "Value"])
+    count = 0
+    for key, value in iter_flatten(nested_json, sep=sep, prefixes=prefixes):
+        writer.writerow([key, value])
+        count += 1
+    return count
+
+
+# Function to extract data from the flattened JSON
+def extract_from_flattened(flattened_data, mapping, selected_fields=None):
+    """Return {label: value} for the mapped fields, optionally restricted to selected_fields."""
+    extracted_data = {}
+    for label, flat_path in mapping.items():
+        if selected_fields is None or label in selected_fields:
+            extracted_data[label] = flattened_data.get(flat_path, MISSING)
+    return extracted_data
+
+
+# Function to extract data directly from the parsed JSON, without flattening it
+@timed('field extraction')
+def extract_from_document(document, mapping, selected_fields=None):
+    """Same result as extract_from_flattened(flatten_json_safe(document), ...).
+
+    mapping is a FieldSchema (exact paths, see ifsneo.schema) or a {label: path} dict.
+    """
+    if isinstance(mapping, FieldSchema):
+        return mapping.extract(document, MISSING, selected_fields)
+    extracted_data = {}
+    for label, accessor in compile_mapping(mapping):
+        if selected_fields is None or label in selected_fields:
+            extracted_data[label] = accessor(document, MISSING)
+    return extracted_data
+
+
+# Columns of the requirement table, with their path inside a scoring
+SCORING_COLUMNS = {
+    "Explanation": ('answers', 'englishExplanationText'),
+    "Detailed Explanation": ('answers', 'explanationText'),
+    "Score": ('score', 'label'),
+    "Response": ('answers', 'fieldAnswers'),
+}
+
+
+# Function to turn the resultScorings section into a DataFrame
+def result_scorings_frame(document, path=None):
+    """Return a DataFrame of every scoring of the document, indexed by UUID.
+
+    path defaults to the IFS Food 8 checklist (ifsneo.mapping.CHECKLIST_PATH).
+    """
+    import pandas as pd
+
+    if path is None:
+        from ifsneo.mapping import CHECKLIST_PATH as path
+
+    result_scorings = get_path(document, path, {})
+    if not isinstance(result_scorings, dict):
+        result_scorings = {}
+    uuids = list(result_scorings)
+    scorings = [result_scorings[uuid] if isinstance(result_scorings[uuid], dict) else {} for uuid in uuids]
+    columns = {
+        column: [get_leaf(scoring, scoring_path, MISSING) for scoring in scorings]
+        for column, scoring_path in SCORING_COLUMNS.items()
+    }
+    return pd.DataFrame(columns, index=pd.Index(uuids, name='UUID'), dtype=object)
+
+
+def _shared_dtype(categories):
+    import pandas as pd
+
+    # True, 1 and 1.0 are equal and hash alike: the types are part of the key
+    key = (str(categories.dtype), tuple((type(value), value) for value in categories.tolist()))
+    with _label_dtypes_lock:
+        dtype = _label_dtypes.get(key)
+        if dtype is None:
+            dtype = pd.CategoricalDtype(categories)
+            _label_dtypes[key] = dtype
+            while len(_label_dtypes) > LABEL_DTYPES_SIZE:
+                _label_dtypes.popitem(last=False)
+        _label_dtypes.move_to_end(key)
+        return dtype
+
+
+def _label_column(values):
+    # Categorical of values when every value is a string, None otherwise: categories
+    # would merge True, 1 and 1.0 in one column and turn None into NaN
+    import pandas as pd
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categorical = values.array
+        if (categorical.codes < 0).any() or not all(isinstance(value, str) for value in categorical.categories):
+            return None
+    elif all(isinstance(value, str) for value in values.tolist()):
+        categorical = pd.Categorical(values)
+    else:
+        return None
+    return pd.Categorical.from_codes(categorical.codes, dtype=_shared_dtype(categorical.categories))
+
+
+def _requirement_labels(uuid_mapping_df):
+    # Num and UUID categoricals of a UUID mapping, built once per mapping
+    key = id(uuid_mapping_df)
+    with _label_dtypes_lock:
+        cached = _mapping_labels.get(key)
+    if cached is None or cached[0] is not uuid_mapping_df:
+        labels = {}
+        for column in ('Num', 'UUID'):
+            values = uuid_mapping_df[column]
+            label = _label_column(values)
+            labels[column] = label if label is not None else values.to_numpy(dtype=object)
+        cached = (uuid_mapping_df, labels)
+        with _label_dtypes_lock:
+            _mapping_labels[key] = cached
+            while len(_mapping_labels) > MAPPING_LABELS_SIZE:
+                _mapping_labels.popitem(last=False)
+    return cached[1]
+
+
+# Function to store the repeated values of a requirement table once
+def compact_requirements(table, columns=LABEL_COLUMNS):
+    """Turn the LABEL_COLUMNS of a requirement table into categoricals, in place; return the table.
+
+    Each row then holds a small integer code, and the labels (requirement
+    numbers, UUIDs, scores, answers) are held once by a dtype shared by
+    every table with the same labels: the tables of all the audits checked
+    against one UUID mapping share the same Num and UUID categories. Also
+    used to share them again in tables unpickled from worker processes.
+
+    Only columns of strings are converted: a column holding None, numbers,
+    booleans, lists or objects (e.g. answers given as True, 1 or 1.0) is
+    left as it is, so that every value reads back unchanged.
+    """
+    for column in columns:
+        if column in table.columns:
+            labels = _label_column(table[column])
+            if labels is not None:
+                table[column] = labels
+    return table
+
+
+# Function to join the UUID mapping with the scorings of the document
+@timed('checklist join')
+def checklist_table(document, uuid_mapping_df, path=None):
+    """Return Num, UUID, Explanation, Detailed Explanation, Score and Response for each row of uuid_mapping_df.
+
+    Requirements missing from the document get 'N/A', as with the flattened lookup.
+    The table keeps the index of uuid_mapping_df, so it can be filtered with .loc.
+    Num, UUID, Score and Response are categoricals (see compact_requirements).
+    """
+    scorings_df = result_scorings_frame(document, path)
+    uuids = uuid_mapping_df['UUID'].astype(str)
+    table = scorings_df.reindex(uuids.values, fill_value=MISSING)
+    labels = _requirement_labels(uuid_mapping_df)
+    table.insert(0, 'UUID', labels['UUID'].copy())
+    table.insert(0, 'Num', labels['Num'].copy())
+    table.index = uuid_mapping_df.index
+    return compact_requirements(table, ['Score', 'Response'])
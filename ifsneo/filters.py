@@ -0,0 +1,63 @@
+# Precomputed index for the cascading Chapitre / Theme / SSTheme filters.
+from itertools import product
+
+# Option meaning "no filter on this level" in the pages
+ALL = "Tous"
+
+UUID_MAPPING_LEVELS = ('Chapitre', 'Theme', 'SSTheme')
+CHECKLIST_LEVELS = ('CHAPITRE', 'SECTION', 'SOUS_SECTION')
+
+
+def _is_missing(value):
+    return value is None or value != value  # NaN is the only value not equal to itself
+
+
+class HierarchyIndex:
+    """Tree of level values (chapter -> theme -> sub-theme) over the rows of a DataFrame.
+
+    Every lookup is a dict access: the option lists and the matching rows are
+    computed for all combinations of selected / unselected levels up front.
+    A selection is a tuple with one value per level, None (or ALL) meaning
+    no filter on that level.
+    """
+
+    def __init__(self, df, levels):
+        self.levels = tuple(levels)
+        rows = {}
+        values = [df[level].tolist() for level in self.levels]
+        for label, row_values in zip(df.index, zip(*values)):
+            # Register the row under every selection it matches
+            choices = [(None,) if _is_missing(value) else (None, value) for value in row_values]
+            for key in product(*choices):
+                rows.setdefault(key, []).append(label)
+        self._rows = rows
+
+        options = {}
+        for key, labels in rows.items():
+            for depth, value in enumerate(key):
+                if value is None:
+                    continue
+                # value is an option of level depth under the other selected levels before it
+                parent = key[:depth] + (None,) * (len(self.levels) - depth)
+                options.setdefault((depth, parent), set()).add(value)
+        self._options = {key: sorted(values) for key, values in options.items()}
+
+    def _key(self, selection, depth=None):
+        selection = tuple(None if value == ALL else value for value in selection)
+        selection = selection + (None,) * (len(self.levels) - len(selection))
+        if depth is not None:
+            selection = selection[:depth] + (None,) * (len(self.levels) - depth)
+        return selection
+
+    def options(self, level, *selection):
+        """Sorted values of level among the rows matching the selection of the previous levels."""
+        depth = self.levels.index(level)
+        return self._options.get((depth, self._key(selection, depth)), [])
+
+    def rows(self, *selection):
+        """Index labels of the rows matching the selection."""
+        return self._rows.get(self._key(selection), [])
+
+    def filter(self, df, *selection):
+        """Rows of df (the DataFrame the index was built on) matching the selection."""
+        return df.loc[self.rows(*selection)]
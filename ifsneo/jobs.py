@@ -0,0 +1,208 @@
+"""Background jobs for the heavy exports (checklist workbook, bulk extraction).
+
+A Streamlit script runs in the thread of its session and starts over on
+every widget change: an export built inline freezes the page and is lost
+on the next click. Exports are instead submitted to a JobQueue shared by
+every session of the server, which runs a few of them at a time on a
+thread pool while the pages poll their status:
+
+    queue = default_queue()
+    job = queue.submit(key, build_workbook, table, name='checklist')
+    job.status, job.progress, job.message
+    queue.cancel(job.id)
+    job.result  # once job.status == DONE
+
+The job function receives a ``progress(fraction, message=None)`` callback
+as its ``progress`` keyword. Cancellation is cooperative: once a job is
+cancelled, its next call to progress() raises JobCancelled. Jobs are
+identified by the key of their inputs: submitting the key of a pending,
+running or finished job returns that job, so the finished jobs (the last
+``max_results``) also serve as a cache of the exports.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ifsneo.timing import Profiler
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+STATUS_LABELS = {
+    PENDING: "En attente",
+    RUNNING: "En cours",
+    DONE: "Terminé",
+    FAILED: "Échec",
+    CANCELLED: "Annulé",
+}
+
+# Exports running at the same time on the server; the others wait in the queue
+EXPORT_WORKERS = 2
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised by the progress callback of a cancelled job."""
+
+
+class Job:
+    """An export submitted to a JobQueue; its attributes are updated by the worker thread."""
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.name = name
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def status_label(self):
+        return STATUS_LABELS[self.status]
+
+    @property
+    def seconds(self):
+        """Run time so far, None while the job waits in the queue."""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def report(self, fraction, message=None):
+        """Progress callback of the job function; raises JobCancelled once the job is cancelled."""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def _run(self, function, args, kwargs):
+        if self._cancel.is_set():
+            return
+        self.started_at = time.time()
+        self.status = RUNNING
+        try:
+            # Spans of the job are logged as their own run (see ifsneo.timing)
+            with Profiler(f'job {self.name}'):
+                result = function(*args, progress=self.report, **kwargs)
+        except JobCancelled:
+            self.status = CANCELLED
+        except Exception as e:  # Shown on the page instead of killing the worker
+            self.error = f"{type(e).__name__}: {' '.join(str(e).split())}"
+            self.status = FAILED
+        else:
+            self.result = result
+            self.progress = 1.0
+            self.status = DONE
+        finally:
+            self.finished_at = time.time()
+
+
+class JobQueue:
+    """Jobs run on a thread pool of max_workers, the last max_results finished ones kept with their result."""
+
+    def __init__(self, max_workers=EXPORT_WORKERS, max_results=16):
+        self.max_workers = max_workers
+        self.max_results = max_results
+        # {id: Job}, least recently submitted first
+        self._jobs = OrderedDict()
+        # {key: id} of the last job submitted with each key
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def submit(self, key, function, *args, name=None, **kwargs):
+        """Run function(*args, progress=..., **kwargs) as a job, unless a job with key is pending, running or done."""
+        with self._lock:
+            job = self._find(key)
+            if job is not None:
+                self._jobs.move_to_end(job.id)
+                return job
+            job = Job(key, name or function.__name__)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ifsneo-job')
+            job._future = self._executor.submit(job._run, function, args, kwargs)
+            self._jobs[job.id] = job
+            self._keys[key] = job.id
+            self._evict()
+            return job
+
+    def find(self, key):
+        """The pending, running or done job of key, None if there is none (or it failed or was cancelled)."""
+        with self._lock:
+            return self._find(key)
+
+    def _find(self, key):
+        job = self._jobs.get(self._keys.get(key))
+        if job is None or job.status in (FAILED, CANCELLED):
+            return None
+        return job
+
+    def get(self, job_id):
+        """The job with this id, None if it is unknown or was evicted."""
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Every job kept, least recently submitted first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a job: at once if it waits in the queue, at its next progress report if it runs."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job._cancel.set()
+        if job._future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def _evict(self):
+        # Running and pending jobs are never evicted; the caller holds _lock
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.max_results)]:
+            del self._jobs[job.id]
+            if self._keys.get(job.key) == job.id:
+                del self._keys[job.key]
+
+    def shutdown(self, cancel=True):
+        """Stop the workers, cancelling the jobs not finished yet unless cancel is False."""
+        if cancel:
+            for job in self.jobs():
+                self.cancel(job.id)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def default_queue():
+    """The JobQueue shared by every session of the process."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
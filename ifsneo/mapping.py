@@ -0,0 +1,110 @@
+# Field mappings shared by the Streamlit pages and the batch tools.
+# Each field is declared once with its real path in the parsed document
+# (see ifsneo.schema); the flattened {label: key} mappings are derived from
+# these schemas for extract_from_flattened().
+from ifsneo.schema import FieldSchema, FieldSpec
+
+# Path of the food_8 questions in the parsed document
+QUESTIONS = "data.modules.food_8.questions"
+
+# Complete schema used by the NEO extraction page and the batch tools
+SITE_SCHEMA = FieldSchema([
+    FieldSpec("Nom du site à auditer", f"{QUESTIONS}.companyName.answer"),
+    FieldSpec("N° COID du portail", f"{QUESTIONS}.companyCoid.answer", type='integer'),
+    FieldSpec("Code GLN", f"{QUESTIONS}.companyGln.answer.0.rootQuestions.companyGlnNumber.answer"),
+    FieldSpec("Rue", f"{QUESTIONS}.companyStreetNo.answer"),
+    FieldSpec("Code postal", f"{QUESTIONS}.companyZip.answer"),
+    FieldSpec("Nom de la ville", f"{QUESTIONS}.companyCity.answer"),
+    FieldSpec("Pays", f"{QUESTIONS}.companyCountry.answer"),
+    FieldSpec("Téléphone", f"{QUESTIONS}.companyTelephone.answer"),
+    FieldSpec("Latitude", f"{QUESTIONS}.companyGpsLatitude.answer", type='number'),
+    FieldSpec("Longitude", f"{QUESTIONS}.companyGpsLongitude.answer", type='number'),
+    FieldSpec("Email", f"{QUESTIONS}.companyEmail.answer"),
+    FieldSpec("Nom du siège social", f"{QUESTIONS}.headquartersName.answer"),
+    FieldSpec("Rue (siège social)", f"{QUESTIONS}.headquartersStreetNo.answer"),
+    FieldSpec("Nom de la ville (siège social)", f"{QUESTIONS}.headquartersCity.answer"),
+    FieldSpec("Code postal (siège social)", f"{QUESTIONS}.headquartersZip.answer"),
+    FieldSpec("Pays (siège social)", f"{QUESTIONS}.headquartersCountry.answer"),
+    FieldSpec("Téléphone (siège social)", f"{QUESTIONS}.headquartersTelephone.answer"),
+    FieldSpec("Surface couverte de l'entreprise (m²)", f"{QUESTIONS}.productionAreaSize.answer", type='number'),
+    FieldSpec("Nombre de bâtiments", f"{QUESTIONS}.numberOfBuildings.answer", type='integer'),
+    FieldSpec("Nombre de lignes de production", f"{QUESTIONS}.numberOfProductionLines.answer", type='integer'),
+    FieldSpec("Nombre d'étages", f"{QUESTIONS}.numberOfFloors.answer", type='integer'),
+    FieldSpec("Nombre maximum d'employés dans l'année, au pic de production", f"{QUESTIONS}.numberOfEmployeesForTimeCalculation.answer", type='integer'),
+    FieldSpec("Commentaires employés", f"{QUESTIONS}.numberOfEmployeesDescription.answer", multiline=True),
+    FieldSpec("Comment employees", f"{QUESTIONS}.numberOfEmployeesDescription_en.answer", multiline=True, language='en'),
+    FieldSpec("Structures décentralisées", f"{QUESTIONS}.companyStructureDecentralisedDescription.answer", multiline=True),
+    FieldSpec("Fonctions centralisées", f"{QUESTIONS}.companyStructureMultiLocationProductionDescription.answer", multiline=True),
+    FieldSpec("Langue parlée et écrite sur le site", f"{QUESTIONS}.workingLanguage.answer"),
+    FieldSpec("Langue du système qualité", f"{QUESTIONS}.qmsLanguage.answer.0"),
+    FieldSpec("Audit scope EN", f"{QUESTIONS}.scopeCertificateScopeDescription_en.answer", multiline=True, language='en'),
+    FieldSpec("Périmètre de l'audit FR", f"{QUESTIONS}.scopeAuditScopeDescription.answer", multiline=True, language='fr'),
+    FieldSpec("Process et activités", f"{QUESTIONS}.scopeProductGroupsDescription.answer", multiline=True),
+    FieldSpec("Activité saisonnière ? (O/N)", f"{QUESTIONS}.seasonalProduction.answer", type='boolean'),
+    FieldSpec("Une partie du procédé de fabrication est-elle sous traitée? (OUI/NON)", f"{QUESTIONS}.partlyOutsourcedProcesses.answer", type='boolean'),
+    FieldSpec("Si oui lister les procédés sous-traités", f"{QUESTIONS}.partlyOutsourcedProcessesDescription.answer", multiline=True),
+    FieldSpec("Avez-vous des produits totalement sous-traités? (OUI/NON)", f"{QUESTIONS}.fullyOutsourcedProducts.answer", type='boolean'),
+    FieldSpec("Si oui, lister les produits totalement sous-traités", f"{QUESTIONS}.fullyOutsourcedProductsDescription.answer", multiline=True),
+    FieldSpec("Avez-vous des produits de négoce? (OUI/NON)", f"{QUESTIONS}.tradedProductsBrokerActivity.answer", type='boolean'),
+    FieldSpec("Si oui, lister les produits de négoce", f"{QUESTIONS}.tradedProductsBrokerActivityDescription.answer", multiline=True),
+    FieldSpec("Produits à exclure du champ d'audit (OUI/NON)", f"{QUESTIONS}.exclusions.answer", type='boolean'),
+    FieldSpec("Préciser les produits à exclure", f"{QUESTIONS}.exclusionsDescription.answer", multiline=True),
+])
+
+# Labels of SITE_SCHEMA kept by the shorter schema of the "Rapport IFS V8" page, in order
+REPORT_LABELS = [
+    "Nom du site à auditer",
+    "N° COID du portail",
+    "Code GLN",
+    "Rue",
+    "Code postal",
+    "Nom de la ville",
+    "Pays",
+    "Téléphone",
+    "Latitude",
+    "Longitude",
+    "Email",
+    "Nom du siège social",
+    "Rue (siège social)",
+    "Nom de la ville (siège social)",
+    "Code postal (siège social)",
+    "Pays (siège social)",
+    "Téléphone (siège social)",
+    "Surface couverte de l'entreprise (m²)",
+    "Nombre de bâtiments",
+    "Nombre de lignes de production",
+    "Nombre d'étages",
+    "Nombre maximum d'employés dans l'année, au pic de production",
+    "Langue parlée et écrite sur le site",
+    "Périmètre de l'audit",
+    "Process et activités",
+    "Activité saisonnière ? (O/N)",
+    "Une partie du procédé de fabrication est-elle sous traitée? (OUI/NON)",
+    "Si oui lister les procédés sous-traités",
+    "Avez-vous des produits totalement sous-traités? (OUI/NON)",
+    "Si oui, lister les produits totalement sous-traités",
+    "Avez-vous des produits de négoce? (OUI/NON)",
+    "Si oui, lister les produits de négoce",
+    "Produits à exclure du champ d'audit (OUI/NON)",
+    "Préciser les produits à exclure",
+]
+
+# Fields of the report that are not in SITE_SCHEMA
+REPORT_ONLY_FIELDS = {
+    "Périmètre de l'audit": FieldSpec("Périmètre de l'audit", f"{QUESTIONS}.scopeCertificateScopeDescription_en.answer", multiline=True, language='en'),
+}
+
+# Shorter schema used by the "Rapport IFS V8" page
+REPORT_SCHEMA = FieldSchema([REPORT_ONLY_FIELDS.get(label) or SITE_SCHEMA[label] for label in REPORT_LABELS])
+
+# Flattened keys of the site schema, for data flattened with flatten_json_safe()
+FLATTENED_FIELD_MAPPING = SITE_SCHEMA.flat_mapping()
+
+# Flattened prefix of the food_8 requirement scorings
+CHECKLIST_PREFIX = "data_modules_food_8_checklists_checklistFood8_resultScorings"
+
+# Path of the food_8 requirement scorings in the parsed document
+CHECKLIST_PATH = ('data', 'modules', 'food_8', 'checklists', 'checklistFood8', 'resultScorings')
+
+# Path of the audit date (first day on site) in the parsed document
+AUDIT_DATE_PATH = ('data', 'modules', 'food_8', 'questions', 'auditDate', 'answer')
@@ -0,0 +1,52 @@
+# Indexed access to the matrixResult list of a food_8 audit.
+
+# Scores counted as non-conformities
+NON_CONFORMITY_SCORES = ('C', 'D', 'MAJOR', 'KO')
+
+# Fields of a matrixResult item that can be filtered on
+MATRIX_FIELDS = ('chapterId', 'scoreId', 'levelId', 'type')
+
+
+class MatrixIndex:
+    """matrixResult items indexed by chapterId, scoreId, levelId and type.
+
+    select() returns the matching items in their original order, without
+    scanning the whole list.
+    """
+
+    def __init__(self, matrix_result):
+        self.items = list(matrix_result)
+        self._positions = {field: {} for field in MATRIX_FIELDS}
+        for position, item in enumerate(self.items):
+            for field in MATRIX_FIELDS:
+                self._positions[field].setdefault(item.get(field), []).append(position)
+
+    def values(self, field):
+        """Distinct values of field."""
+        return list(self._positions[field])
+
+    def _matching(self, field, wanted):
+        if isinstance(wanted, (list, tuple, set, frozenset)):
+            positions = set()
+            for value in wanted:
+                positions.update(self._positions[field].get(value, ()))
+            return positions
+        return set(self._positions[field].get(wanted, ()))
+
+    def select(self, chapter=None, scores=None, level=None, type=None):
+        """Items matching every given filter; scores may be a single value or a collection."""
+        filters = [
+            (field, wanted)
+            for field, wanted in zip(MATRIX_FIELDS, (chapter, scores, level, type))
+            if wanted is not None
+        ]
+        if not filters:
+            return list(self.items)
+        # Start from the smallest candidate set
+        candidates = sorted((self._matching(field, wanted) for field, wanted in filters), key=len)
+        positions = candidates[0].intersection(*candidates[1:])
+        return [self.items[position] for position in sorted(positions)]
+
+    def non_conformities(self, chapter=None):
+        """Items scored C, D, MAJOR or KO, optionally for a single chapter."""
+        return self.select(chapter=chapter, scores=NON_CONFORMITY_SCORES)
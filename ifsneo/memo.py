@@ -0,0 +1,69 @@
+# Memoization of parsed uploads, keyed by the SHA-256 of their content.
+# Streamlit reruns the whole page on every widget change; with this cache the
+# upload is only parsed again when its content changes.
+import hashlib
+from collections import OrderedDict
+from io import BytesIO
+
+from ifsneo.parsing import load_document
+from ifsneo.timing import timed
+
+SESSION_KEY = 'ifsneo_document_cache'
+
+
+# A parsed upload and the values derived from it
+class CachedDocument:
+
+    def __init__(self, digest, size, document):
+        self.digest = digest
+        self.size = size
+        self.document = document
+        self._derived = {}
+
+    def derived(self, key, compute):
+        """Return the value stored under key, calling compute() the first time."""
+        if key not in self._derived:
+            self._derived[key] = compute()
+        return self._derived[key]
+
+
+class DocumentCache:
+    """LRU of CachedDocument, bounded by entry count and by total upload size."""
+
+    def __init__(self, max_entries=4, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @timed('upload cache')
+    def load(self, data):
+        """Return the CachedDocument of the bytes data, parsing it on a miss."""
+        digest = hashlib.sha256(data).hexdigest()
+        entry = self._entries.get(digest)
+        if entry is not None:
+            self._entries.move_to_end(digest)
+            return entry
+        entry = CachedDocument(digest, len(data), load_document(BytesIO(data)))
+        self._entries[digest] = entry
+        self._evict()
+        return entry
+
+    def _evict(self):
+        # Always keep the most recent entry, even when it is larger than max_bytes
+        total = sum(entry.size for entry in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+
+
+def session_document_cache(session_state, **kwargs):
+    """Return the DocumentCache of a session, creating it in session_state if needed."""
+    if SESSION_KEY not in session_state:
+        session_state[SESSION_KEY] = DocumentCache(**kwargs)
+    return session_state[SESSION_KEY]
@@ -0,0 +1,138 @@
+"""Registry of the NEO modules (IFS standards) that can be extracted.
+
+A NEO export stores each standard under ``data.modules.<name>``. Each module
+is registered here with the import path of its plugin and the parts of the
+document it reads; the plugin (field schemas, checklist location) is only
+imported the first time a document containing that module is opened.
+
+    register_module('food_8', 'ifsneo.modules.food_8', prefixes=(...))
+    module = detect_module(document)   # imports ifsneo.modules.food_8
+    module.site_schema, module.checklist_table(document, uuid_mapping_df)
+
+A plugin module defines ``MODULE``, a NeoModule instance.
+"""
+import importlib
+import threading
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass
+
+from ifsneo.paths import get_path
+
+MODULES_PATH = ('data', 'modules')
+
+ModuleEntry = namedtuple('ModuleEntry', ['name', 'plugin', 'prefixes'])
+
+_registry = OrderedDict()
+_loaded = {}
+_lock = threading.Lock()
+
+
+class UnsupportedModuleError(ValueError):
+    """The document contains no registered NEO module."""
+
+
+@dataclass(frozen=True)
+class NeoModule:
+    """What the extraction needs to know about one NEO module."""
+    name: str
+    title: str
+    site_schema: object  # FieldSchema
+    report_schema: object  # FieldSchema
+    checklist_path: tuple  # resultScorings {uuid: scoring}
+    audit_date_path: tuple = None
+    overall_path: tuple = None
+    matrix_path: tuple = None
+    requirements_reference: str = None  # Name of the refstore file listing the requirements (Num, UUID)
+
+    def checklist_table(self, document, uuid_mapping_df=None):
+        """Requirement table of the document (see ifsneo.extraction.checklist_table).
+
+        Without uuid_mapping_df every scoring of the document is listed, with 'N/A' as Num.
+        """
+        from ifsneo.extraction import MISSING, checklist_table, compact_requirements, result_scorings_frame
+
+        if uuid_mapping_df is not None:
+            return checklist_table(document, uuid_mapping_df, self.checklist_path)
+        table = result_scorings_frame(document, self.checklist_path).reset_index()
+        table.insert(0, 'Num', MISSING)
+        return compact_requirements(table)
+
+    def audit_date(self, document):
+        if self.audit_date_path is None:
+            return None
+        value = get_path(document, self.audit_date_path, None)
+        return None if isinstance(value, (dict, list)) else value
+
+    def overall(self, document):
+        """Overall result of the audit (level, passed, percent), or {}."""
+        return get_path(document, self.overall_path, {}) if self.overall_path else {}
+
+    def matrix(self, document):
+        """matrixResult items of the audit, or []."""
+        return get_path(document, self.matrix_path, []) if self.matrix_path else []
+
+
+def register_module(name, plugin, prefixes=()):
+    """Register the module name, implemented by the plugin module at the import path plugin.
+
+    prefixes are the dotted paths, relative to data.modules.<name>, that
+    load_document() keeps when streaming.
+    """
+    with _lock:
+        _registry[name] = ModuleEntry(name, plugin, tuple(prefixes))
+        _loaded.pop(name, None)
+
+
+def registered_modules():
+    """Names of the registered modules, in registration order."""
+    return list(_registry)
+
+
+def get_module(name):
+    """Return the NeoModule of name, importing its plugin on first use."""
+    module = _loaded.get(name)
+    if module is not None:
+        return module
+    entry = _registry.get(name)
+    if entry is None:
+        raise UnsupportedModuleError(f"unknown NEO module {name!r} (registered: {', '.join(_registry) or 'none'})")
+    with _lock:
+        if name not in _loaded:
+            _loaded[name] = importlib.import_module(entry.plugin).MODULE
+        return _loaded[name]
+
+
+def document_prefixes():
+    """Absolute paths of the parts of a document read by the registered modules."""
+    return tuple(
+        '.'.join(MODULES_PATH + (entry.name, prefix))
+        for entry in _registry.values()
+        for prefix in entry.prefixes
+    )
+
+
+def document_modules(document):
+    """Names of the registered modules present in the document."""
+    modules = get_path(document, MODULES_PATH, {})
+    if not isinstance(modules, dict):
+        return []
+    return [name for name in modules if name in _registry]
+
+
+def detect_module(document):
+    """NeoModule of the document (the first registered one it contains)."""
+    modules = get_path(document, MODULES_PATH, {})
+    names = [name for name in _registry if name in modules] if isinstance(modules, dict) else []
+    if not names:
+        raise UnsupportedModuleError(
+            f"no supported NEO module in the document (supported: {', '.join(_registry)})"
+        )
+    return get_module(names[0])
+
+
+register_module('food_8', 'ifsneo.modules.food_8', prefixes=(
+    'questions',
+    'checklists.checklistFood8.resultScorings',
+    'result.overall',
+    'matrixResult',
+))
@@ -0,0 +1,15 @@
+# IFS Food version 8 (NEO module "food_8").
+from ifsneo.mapping import AUDIT_DATE_PATH, CHECKLIST_PATH, REPORT_SCHEMA, SITE_SCHEMA
+from ifsneo.modules import NeoModule
+
+MODULE = NeoModule(
+    name='food_8',
+    title="IFS Food 8",
+    site_schema=SITE_SCHEMA,
+    report_schema=REPORT_SCHEMA,
+    checklist_path=CHECKLIST_PATH,
+    audit_date_path=AUDIT_DATE_PATH,
+    overall_path=('data', 'modules', 'food_8', 'result', 'overall'),
+    matrix_path=('data', 'modules', 'food_8', 'matrixResult'),
+    requirements_reference='uuid_mapping',
+)
@@ -0,0 +1,49 @@
+# Server-side search and pagination of the tables shown in the pages.
+# Only the rows of the current page are sent to the browser, so the time to
+# render a table and the size of the page do not depend on how many rows the
+# filters select.
+from collections import namedtuple
+
+PAGE_SIZES = [25, 50, 100]
+
+# One page of a table: its rows, its number (from 1), the number of pages,
+# the number of rows of the whole table and the position of the first row (from 1)
+TablePage = namedtuple('TablePage', ['rows', 'number', 'pages', 'total', 'first'])
+
+
+def search_text(df, columns=None):
+    """Lower-cased text of the columns of each row of df, to search with search()."""
+    columns = list(columns) if columns is not None else list(df.columns)
+    text = df[columns[0]].astype(str)
+    for column in columns[1:]:
+        text = text + '\n' + df[column].astype(str)
+    return text.str.casefold()
+
+
+def search(df, query, text=None):
+    """Rows of df containing every word of query (case-insensitive).
+
+    text is the search_text() of df or of a table df is a subset of; pass it
+    to avoid rebuilding the text of every row on each search.
+    """
+    words = query.casefold().split() if query else []
+    if not words:
+        return df
+    text = search_text(df) if text is None else text.loc[df.index]
+    mask = text.str.contains(words[0], regex=False)
+    for word in words[1:]:
+        mask &= text.str.contains(word, regex=False)
+    return df[mask.values]
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+
+def paginate(df, number=1, page_size=PAGE_SIZES[0]):
+    """Return the TablePage number of df; number is clamped to the existing pages."""
+    total = len(df)
+    pages = page_count(total, page_size)
+    number = min(max(1, int(number)), pages)
+    start = (number - 1) * page_size
+    return TablePage(df.iloc[start:start + page_size], number, pages, total, start + 1 if total else 0)
@@ -0,0 +1,109 @@
+# Parsing of uploaded .ifs files.
+# With ijson installed only the parts of the document read by the registered
+# NEO modules are built; otherwise the whole file goes through the standard
+# json parser.
+import json
+import sys
+
+from ifsneo.modules import document_prefixes
+from ifsneo.timing import timed
+
+_CONTAINER_START = ('start_map', 'start_array')
+_CONTAINER_END = ('end_map', 'end_array')
+
+# ijson returns a new string for every key and value; keys and short values
+# (score labels, answers, UUIDs) are interned, so the keys repeated in every
+# scoring and the labels repeated across scorings and documents are held once
+INTERNED_LENGTH = 36
+
+# Byte order mark written by some editors and Windows tools; json.load skips it, ijson does not
+UTF8_BOM = b'\xef\xbb\xbf'
+
+
+def _set_path(document, path, value):
+    node = document
+    for segment in path[:-1]:
+        node = node.setdefault(segment, {})
+    node[path[-1]] = value
+
+
+# File object returning head before the rest of fp (used when fp cannot seek back)
+class _Prepended:
+
+    def __init__(self, head, fp):
+        self.head = head
+        self.fp = fp
+
+    def read(self, size=-1):
+        if not self.head:
+            return self.fp.read(size)
+        if size is None or size < 0:
+            data, self.head = self.head + self.fp.read(), b''
+            return data
+        data, self.head = self.head[:size], self.head[size:]
+        if len(data) < size:
+            data += self.fp.read(size - len(data))
+        return data
+
+
+def _skip_bom(fp):
+    """Return fp positioned after a leading UTF-8 byte order mark, if any."""
+    head = fp.read(len(UTF8_BOM))
+    if head == UTF8_BOM:
+        return fp
+    if hasattr(fp, 'seekable') and fp.seekable():
+        fp.seek(-len(head), 1)
+        return fp
+    return _Prepended(head, fp)
+
+
+def _load_prefixes(fp, prefixes):
+    import ijson
+    from ijson.common import ObjectBuilder
+
+    wanted = set(prefixes)
+    document = {}
+    builder = None
+    current = None
+    for prefix, event, value in ijson.parse(_skip_bom(fp), use_float=True):
+        if event == 'map_key' or (event == 'string' and len(value) <= INTERNED_LENGTH):
+            value = sys.intern(value)
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == current and event in _CONTAINER_END:
+                _set_path(document, current.split('.'), builder.value)
+                builder = None
+        elif prefix in wanted and event != 'map_key':
+            if event in _CONTAINER_START:
+                current = prefix
+                builder = ObjectBuilder()
+                builder.event(event, value)
+            else:
+                _set_path(document, prefix.split('.'), value)
+    return document
+
+
+# Function to load an uploaded .ifs file
+@timed('document parse')
+def load_document(fp, prefixes=None, streaming=True):
+    """Parse the binary file object fp and return the document.
+
+    When streaming and ijson is available, only the subtrees listed in
+    prefixes are kept (at their usual place in the document); by default
+    those read by the registered NEO modules (see ifsneo.modules). Errors
+    are raised as json.JSONDecodeError in both modes; a leading UTF-8 byte
+    order mark is accepted in both modes, as json.load does.
+    """
+    if prefixes is None:
+        prefixes = document_prefixes()
+    if streaming:
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+        if ijson is not None:
+            try:
+                return _load_prefixes(fp, prefixes)
+            except ijson.JSONError as e:
+                raise json.JSONDecodeError(str(e), '', 0) from e
+    return json.load(fp)
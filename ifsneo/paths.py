@@ -0,0 +1,113 @@
+# Direct access to values of a parsed .ifs document, without flattening it.
+# Paths are either dotted ("data.modules.food_8.questions.companyName.answer")
+# or the flattened keys of flatten_json_safe(), kept as a compatibility alias.
+from functools import lru_cache
+
+# Marker for a path that does not lead to a value
+_NOT_FOUND = object()
+
+# Resolved flattened keys: {(flat_key, sep): path tuple}
+_RESOLVED_FLAT_KEYS = {}
+
+
+def split_path(dotted_path):
+    """Split a dotted path into a tuple of segments."""
+    return tuple(dotted_path.split('.'))
+
+
+def get_path(document, path, default=_NOT_FOUND):
+    """Walk path in document and return the value found, or default."""
+    node = document
+    for segment in path:
+        if isinstance(node, dict):
+            node = node.get(segment, _NOT_FOUND)
+        elif isinstance(node, list):
+            try:
+                node = node[int(segment)]
+            except (ValueError, IndexError):
+                return default
+        else:
+            return default
+        if node is _NOT_FOUND:
+            return default
+    return node
+
+
+def get_leaf(document, path, default):
+    """Like get_path() but only return primitives, as flatten_json_safe() would."""
+    value = get_path(document, path, _NOT_FOUND)
+    if value is _NOT_FOUND or isinstance(value, (dict, list)):
+        return default
+    return value
+
+
+def _resolve_tokens(node, tokens, start, sep, ambiguous):
+    if start == len(tokens):
+        return ()
+    if isinstance(node, dict):
+        # JSON keys may contain the separator themselves, so try every split
+        keys = [key for key in (sep.join(tokens[start:end]) for end in range(start + 1, len(tokens) + 1)) if key in node]
+        if len(keys) > 1:
+            # Several keys flatten alike: the one last in document order wins, as it
+            # overwrites the others in flatten_json_safe()
+            ambiguous.append(start)
+            order = {key: position for position, key in enumerate(node)}
+            keys.sort(key=order.__getitem__, reverse=True)
+        for key in keys:
+            rest = _resolve_tokens(node[key], tokens, start + key.count(sep) + 1, sep, ambiguous)
+            if rest is not None:
+                return (key,) + rest
+    elif isinstance(node, list) and tokens[start].isdigit():
+        index = int(tokens[start])
+        if index < len(node):
+            rest = _resolve_tokens(node[index], tokens, start + 1, sep, ambiguous)
+            if rest is not None:
+                return (tokens[start],) + rest
+    return None
+
+
+def resolve_flat_key(document, flat_key, sep='_'):
+    """Return the path of document matching a flattened key, or None."""
+    return _resolve_tokens(document, flat_key.split(sep), 0, sep, [])
+
+
+def get_flat_key(document, flat_key, default, sep='_'):
+    """Return the leaf value stored under a flattened key, or default."""
+    path = _RESOLVED_FLAT_KEYS.get((flat_key, sep))
+    if path is not None:
+        value = get_leaf(document, path, _NOT_FOUND)
+        if value is not _NOT_FOUND:
+            return value
+    # Unknown key or a document laid out differently: resolve it again
+    ambiguous = []
+    path = _resolve_tokens(document, flat_key.split(sep), 0, sep, ambiguous)
+    if path is None:
+        return default
+    if not ambiguous:
+        # A key matching several paths depends on the document: it is resolved every time
+        _RESOLVED_FLAT_KEYS[(flat_key, sep)] = path
+    return get_leaf(document, path, default)
+
+
+def compile_accessor(path, sep='_'):
+    """Return a function(document, default) reading path from a document.
+
+    path may be a tuple of segments, a dotted path or a flattened key.
+    """
+    if isinstance(path, (tuple, list)):
+        segments = tuple(path)
+    elif '.' in path:
+        segments = split_path(path)
+    else:
+        return lambda document, default: get_flat_key(document, path, default, sep)
+    return lambda document, default: get_leaf(document, segments, default)
+
+
+@lru_cache(maxsize=32)
+def _compile_items(items):
+    return tuple((label, compile_accessor(path)) for label, path in items)
+
+
+def compile_mapping(mapping):
+    """Compile a {label: path} mapping into a tuple of (label, accessor)."""
+    return _compile_items(tuple(mapping.items()))
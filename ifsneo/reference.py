@@ -0,0 +1,97 @@
+# Loading of the reference CSV files (requirement UUIDs, checklist).
+# Nothing is fetched at import time: callers decide when to load.
+import time
+from io import StringIO
+
+from ifsneo.timing import timed
+
+# URL for the UUID CSV
+UUID_MAPPING_URL = "https://raw.githubusercontent.com/M00N69/Gemini-Knowledge/refs/heads/main/IFSV8listUUID.csv"
+
+# URL for the IFS Food V8 checklist CSV
+CHECKLIST_URL = "https://raw.githubusercontent.com/M00N69/Action-planGroq/main/Guide%20Checklist_IFS%20Food%20V%208%20-%20CHECKLIST.csv"
+
+REQUIRED_COLUMNS = ['UUID', 'Num', 'Chapitre', 'Theme', 'SSTheme']
+
+# Seconds to wait for GitHub before giving up
+REQUEST_TIMEOUT = 10
+
+# Attempts after a failed download (network error or server error), waiting RETRY_BACKOFF, then twice as long, ...
+REQUEST_RETRIES = 2
+RETRY_BACKOFF = 0.5
+
+
+class ReferenceDataError(Exception):
+    """Raised when a reference file cannot be downloaded or is malformed."""
+
+
+# Clean up the raw UUID mapping
+def prepare_uuid_mapping(uuid_mapping_df):
+    """Validate the columns of the UUID mapping and drop unusable rows."""
+    for column in REQUIRED_COLUMNS:
+        if column not in uuid_mapping_df.columns:
+            raise ReferenceDataError(f"Le fichier CSV doit contenir une colonne '{column}' avec des valeurs valides.")
+
+    uuid_mapping_df = uuid_mapping_df.dropna(subset=['UUID', 'Num'])  # Drop rows with empty 'UUID' or 'Num' values
+    uuid_mapping_df['Chapitre'] = uuid_mapping_df['Chapitre'].astype(str).str.strip()
+    uuid_mapping_df = uuid_mapping_df.drop_duplicates(subset=['Chapitre', 'Num'])  # Remove duplicate rows based on 'Chapitre' and 'Num'
+    return uuid_mapping_df
+
+
+# Read the UUID mapping from the CSV text
+@timed('reference parse')
+def parse_uuid_mapping(csv_text):
+    import pandas as pd
+
+    return prepare_uuid_mapping(pd.read_csv(StringIO(csv_text)))
+
+
+# Read the IFS Food V8 checklist from the CSV text
+@timed('reference parse')
+def parse_checklist(csv_text):
+    import pandas as pd
+
+    try:
+        # Skip malformed lines instead of rejecting the whole file
+        return pd.read_csv(StringIO(csv_text), sep=";", on_bad_lines='skip')
+    except pd.errors.ParserError as e:
+        raise ReferenceDataError(f"Error parsing CSV file: {e}") from e
+
+
+# Download a reference file, honouring the ETag of the copy we already have
+@timed('reference download')
+def fetch_reference_text(url, etag=None, timeout=REQUEST_TIMEOUT, retries=REQUEST_RETRIES):
+    """Return (text, etag); text is None when the server answers 304 Not Modified."""
+    import requests
+
+    headers = {'If-None-Match': etag} if etag else {}
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        try:
+            response = requests.get(url, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise ReferenceDataError(f"Impossible de charger le fichier CSV depuis l'URL fourni : {url}") from e
+            continue
+        # Server errors are usually transient, client errors are not
+        if response.status_code < 500:
+            break
+    if response.status_code == 304:
+        return None, etag
+    if response.status_code != 200:
+        raise ReferenceDataError(f"Impossible de charger le fichier CSV depuis l'URL fourni : {url}")
+    response.encoding = 'utf-8'
+    return response.text, response.headers.get('ETag')
+
+
+# Load the CSV mapping for UUIDs corresponding to NUM from a URL
+def load_uuid_mapping_from_url(url=UUID_MAPPING_URL, timeout=REQUEST_TIMEOUT):
+    text, _ = fetch_reference_text(url, timeout=timeout)
+    return parse_uuid_mapping(text)
+
+
+# Load the IFS Food V8 checklist CSV from a URL
+def load_checklist(url=CHECKLIST_URL, timeout=REQUEST_TIMEOUT):
+    text, _ = fetch_reference_text(url, timeout=timeout)
+    return parse_checklist(text)
@@ -0,0 +1,369 @@
+"""Local store for the reference CSV files (UUID mapping, checklist).
+
+Lookup order for each file:
+
+1. in-process LRU (a Streamlit rerun or a batch job pays nothing);
+2. the on-disk cache (``IFSNEO_CACHE_DIR``, default ``~/.cache/ifsneo``),
+   holding the parsed DataFrame as a pickle plus its ETag and SHA-256;
+3. the snapshot ``ifsneo/data/<name>.csv``, if one was written with
+   ``refresh --snapshot`` (none is shipped with the code).
+
+The cached copy is revalidated against GitHub with ``If-None-Match`` once
+it is older than ``max_age`` seconds; a new download is only re-parsed when
+its SHA-256 differs. Downloads run in background threads, all files at
+once, with a timeout and retries: a stale local copy is served while it is
+revalidated, and callers only wait (at most ``timeout`` seconds) when no
+local copy exists yet. Any network failure falls back to the local copy,
+and ``IFSNEO_OFFLINE=1`` disables the network entirely.
+
+``IFSNEO_REFERENCE_URL`` replaces GitHub by another server holding
+``<name>.csv`` files, e.g. a local stub serving a snapshot for tests:
+
+    python -m http.server 8765 --directory ifsneo/data
+    IFSNEO_REFERENCE_URL=http://localhost:8765 streamlit run app.py
+
+    python -m ifsneo.refstore refresh             # update the on-disk cache
+    python -m ifsneo.refstore refresh --snapshot  # update ifsneo/data/
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from ifsneo.filters import CHECKLIST_LEVELS, UUID_MAPPING_LEVELS, HierarchyIndex
+from ifsneo.reference import (
+    CHECKLIST_URL,
+    UUID_MAPPING_URL,
+    ReferenceDataError,
+    fetch_reference_text,
+    parse_checklist,
+    parse_uuid_mapping,
+)
+
+ReferenceSource = namedtuple('ReferenceSource', ['url', 'parse'])
+
+# Reference files known to the store
+REFERENCE_SOURCES = {
+    'uuid_mapping': ReferenceSource(UUID_MAPPING_URL, parse_uuid_mapping),
+    'checklist': ReferenceSource(CHECKLIST_URL, parse_checklist),
+}
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Seconds before a cached file is revalidated against its URL
+DEFAULT_MAX_AGE = 24 * 3600
+
+# Seconds a caller waits for a reference file that has no local copy yet
+DEFAULT_WAIT = 15
+
+LRU_SIZE = 8
+
+_lru = OrderedDict()
+# {(name, levels): (DataFrame, HierarchyIndex)}
+_indexes = {}
+_lock = threading.Lock()
+# Background downloads: {name: Future}
+_pending = {}
+_executor = None
+
+
+def cache_dir():
+    return os.environ.get('IFSNEO_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'ifsneo')
+
+
+def reference_url(name):
+    """URL a reference file is downloaded from (IFSNEO_REFERENCE_URL/<name>.csv when set)."""
+    base_url = os.environ.get('IFSNEO_REFERENCE_URL')
+    if base_url:
+        return f"{base_url.rstrip('/')}/{name}.csv"
+    return REFERENCE_SOURCES[name].url
+
+
+def is_offline():
+    return os.environ.get('IFSNEO_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _read_meta(name):
+    try:
+        with open(os.path.join(cache_dir(), f'{name}.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(name, df, meta):
+    directory = cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    # Write to temporary files first so a concurrent reader never sees half a file
+    pickle_path = os.path.join(directory, f'{name}.pkl')
+    df.to_pickle(pickle_path + '.tmp')
+    os.replace(pickle_path + '.tmp', pickle_path)
+    meta_path = os.path.join(directory, f'{name}.json')
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _load_cached(name):
+    import pandas as pd
+
+    meta = _read_meta(name)
+    if meta is None:
+        return None, None
+    try:
+        return pd.read_pickle(os.path.join(cache_dir(), f'{name}.pkl')), meta
+    except (OSError, ValueError, EOFError):
+        return None, None
+
+
+def _parse(name, text):
+    # Empty or corrupt files make pandas raise EmptyDataError / ParserError (ValueErrors)
+    try:
+        return REFERENCE_SOURCES[name].parse(text)
+    except ValueError as e:
+        raise ReferenceDataError(f"Le fichier de référence '{name}' est illisible : {e}") from e
+
+
+def _load_snapshot(name):
+    path = os.path.join(SNAPSHOT_DIR, f'{name}.csv')
+    try:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        df = _parse(name, text)
+    except (OSError, ValueError, ReferenceDataError):
+        return None, None
+    return df, {'sha256': _sha256(text), 'etag': None, 'checked_at': 0}
+
+
+def _revalidate(name, df, meta):
+    """Check the URL for a newer version; return the (possibly unchanged) df and meta."""
+    text, etag = fetch_reference_text(reference_url(name), etag=meta.get('etag') if df is not None else None)
+    if text is not None and (df is None or _sha256(text) != meta.get('sha256')):
+        df = _parse(name, text)
+        sha256 = _sha256(text)
+    else:
+        sha256 = meta['sha256']
+    meta = {'sha256': sha256, 'etag': etag, 'checked_at': time.time()}
+    try:
+        _write_cache(name, df, meta)
+    except OSError:
+        # Read-only or full cache folder: the download is still served from memory
+        pass
+    return df, meta
+
+
+def _local_copy(name):
+    # In-process copy, then on-disk cache, then bundled snapshot; the caller holds _lock
+    entry = _lru.get(name)
+    if entry is not None:
+        _lru.move_to_end(name)
+        return entry
+    df, meta = _load_cached(name)
+    if df is None:
+        df, meta = _load_snapshot(name)
+    if df is None:
+        return None, None
+    _remember(name, df, meta)
+    return df, meta
+
+
+def _remember(name, df, meta):
+    _lru[name] = (df, meta)
+    _lru.move_to_end(name)
+    while len(_lru) > LRU_SIZE:
+        _lru.popitem(last=False)
+
+
+def _fetch(name):
+    """Revalidate a reference file against its URL (run in the background); return its DataFrame."""
+    with _lock:
+        df, meta = _local_copy(name)
+    try:
+        df, meta = _revalidate(name, df, meta or {})
+    except (ReferenceDataError, OSError) as e:
+        if df is None:
+            if isinstance(e, ReferenceDataError):
+                raise
+            raise ReferenceDataError(f"Impossible de lire le fichier de référence '{name}' : {e}") from e
+        # Keep serving the local copy, retry after max_age
+        meta = dict(meta, checked_at=time.time())
+    with _lock:
+        _remember(name, df, meta)
+    return df
+
+
+def _schedule(name):
+    """Future of the download of name, starting one unless it is already running."""
+    global _executor
+    with _lock:
+        future = _pending.get(name)
+        if future is None or future.done():
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=len(REFERENCE_SOURCES), thread_name_prefix='ifsneo-reference')
+            future = _executor.submit(_fetch, name)
+            _pending[name] = future
+        return future
+
+
+def prefetch_references(names=None, max_age=DEFAULT_MAX_AGE):
+    """Start downloading, in parallel and in the background, the reference files without a fresh local copy.
+
+    Returns {name: Future} of the downloads started (or already running).
+    """
+    if is_offline():
+        return {}
+    futures = {}
+    now = time.time()
+    for name in names or REFERENCE_SOURCES:
+        with _lock:
+            df, meta = _local_copy(name)
+        if df is None or now - meta.get('checked_at', 0) >= max_age:
+            futures[name] = _schedule(name)
+    return futures
+
+
+def get_reference(name, max_age=DEFAULT_MAX_AGE, refresh=False, timeout=DEFAULT_WAIT):
+    """Return the DataFrame of a reference file; the result must not be modified.
+
+    A local copy older than max_age is returned at once and revalidated in
+    the background. The network is only waited for when there is no local
+    copy yet, or with refresh, for at most timeout seconds (None: no limit).
+    """
+    if name not in REFERENCE_SOURCES:
+        raise ReferenceDataError(f"Fichier de référence inconnu : {name}")
+    with _lock:
+        df, meta = _local_copy(name)
+    if df is not None and not refresh and time.time() - meta.get('checked_at', 0) < max_age:
+        return df
+    if is_offline():
+        if df is None:
+            raise ReferenceDataError(f"Aucune copie locale du fichier de référence '{name}' et le mode hors ligne est actif.")
+        return df
+
+    future = _schedule(name)
+    if df is not None and not refresh:
+        return df
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        if df is not None:
+            return df
+        raise ReferenceDataError(
+            f"Le fichier de référence '{name}' n'est pas encore disponible (délai de {timeout} s dépassé) : "
+            "le téléchargement continue, réessayez dans un instant."
+        ) from None
+
+
+def reference_digest(name, df=None):
+    """SHA-256 of the version of a reference file served now (None without a local copy).
+
+    With df, a DataFrame returned for name, the digest is the one of that
+    version, even if a newer one replaced it since: use it to key results
+    built from df.
+    """
+    with _lock:
+        current, meta = _local_copy(name)
+        if df is None or df is current:
+            return meta.get('sha256') if meta else None
+    # df was replaced in the meantime: identify it by its content
+    import pandas as pd
+
+    return 'content:' + format(int(pd.util.hash_pandas_object(df).sum()), 'x')
+
+
+def get_uuid_mapping(**kwargs):
+    """Return the UUID / Num / Chapitre / Theme / SSTheme mapping."""
+    return get_reference('uuid_mapping', **kwargs)
+
+
+def get_checklist(**kwargs):
+    """Return the IFS Food V8 checklist."""
+    return get_reference('checklist', **kwargs)
+
+
+def get_reference_with_index(name, levels, **kwargs):
+    """Return (DataFrame, HierarchyIndex) of a reference file, the index built once per version of the file.
+
+    The index is always the one of the DataFrame returned with it, even if
+    the file is refreshed in between: use this rather than two lookups.
+    """
+    df = get_reference(name, **kwargs)
+    with _lock:
+        cached = _indexes.get((name, tuple(levels)))
+        if cached is None or cached[0] is not df:
+            cached = (df, HierarchyIndex(df, levels))
+            _indexes[(name, tuple(levels))] = cached
+        return cached
+
+
+def get_reference_index(name, levels, **kwargs):
+    """Return the HierarchyIndex of a reference file, built once per version of the file."""
+    return get_reference_with_index(name, levels, **kwargs)[1]
+
+
+def get_uuid_mapping_index(**kwargs):
+    """Return the Chapitre / Theme / SSTheme index of the UUID mapping."""
+    return get_reference_index('uuid_mapping', UUID_MAPPING_LEVELS, **kwargs)
+
+
+def get_checklist_index(**kwargs):
+    """Return the CHAPITRE / SECTION / SOUS_SECTION index of the checklist."""
+    return get_reference_index('checklist', CHECKLIST_LEVELS, **kwargs)
+
+
+def get_uuid_mapping_with_index(**kwargs):
+    """Return the UUID mapping and its Chapitre / Theme / SSTheme index."""
+    return get_reference_with_index('uuid_mapping', UUID_MAPPING_LEVELS, **kwargs)
+
+
+def get_checklist_with_index(**kwargs):
+    """Return the checklist and its CHAPITRE / SECTION / SOUS_SECTION index."""
+    return get_reference_with_index('checklist', CHECKLIST_LEVELS, **kwargs)
+
+
+def clear_memory_cache():
+    with _lock:
+        _lru.clear()
+        _indexes.clear()
+
+
+def write_snapshot(name):
+    """Download a reference file into ifsneo/data/, the copy used when there is no cache and no network."""
+    text, _ = fetch_reference_text(reference_url(name))
+    _parse(name, text)  # Refuse to bundle a file we cannot read
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, f'{name}.csv'), 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m ifsneo.refstore', description="Reference data store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    refresh_parser = subparsers.add_parser('refresh', help="download the reference files")
+    refresh_parser.add_argument('--snapshot', action='store_true', help="write the bundled snapshot instead of the cache")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        for name in REFERENCE_SOURCES:
+            write_snapshot(name)
+            print(f"{name}: snapshot written to {SNAPSHOT_DIR}")
+        return
+    # Every file is downloaded at the same time
+    futures = {name: _schedule(name) for name in REFERENCE_SOURCES}
+    for name, future in futures.items():
+        df = future.result()
+        print(f"{name}: {len(df)} rows cached in {cache_dir()}")
+
+
+if __name__ == '__main__':
+    main()
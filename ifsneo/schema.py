@@ -0,0 +1,149 @@
+# Declarative description of the fields extracted from a document.
+# Each field gives its label, its real path in the parsed JSON, its type,
+# whether it is edited as multi-line text and the language of its content.
+# The paths are exact, so keys containing '_' (scopeCertificateScopeDescription_en)
+# need no guessing, and check() reports the fields a document does not have
+# instead of hiding them behind 'N/A'.
+from dataclasses import dataclass
+
+from ifsneo.paths import _NOT_FOUND, compile_accessor, get_path, split_path
+
+FIELD_TYPES = ('text', 'integer', 'number', 'boolean')
+
+# Answers accepted for boolean fields, besides true / false
+BOOLEAN_TEXTS = {'true', 'false', 'yes', 'no', 'oui', 'non', 'o', 'n', 'y', '0', '1'}
+
+
+class SchemaError(ValueError):
+    """Invalid schema, or a document that does not match it."""
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    label: str
+    path: tuple
+    type: str = 'text'
+    multiline: bool = False
+    language: str = None  # None: language of the audit
+
+    def __post_init__(self):
+        if isinstance(self.path, str):
+            object.__setattr__(self, 'path', split_path(self.path))
+        else:
+            object.__setattr__(self, 'path', tuple(self.path))
+        if self.type not in FIELD_TYPES:
+            raise SchemaError(f"{self.label}: unknown type {self.type!r} (expected one of {', '.join(FIELD_TYPES)})")
+
+    @property
+    def flat_key(self):
+        """Key of the field in the output of flatten_json_safe()."""
+        return '_'.join(str(segment) for segment in self.path)
+
+
+# A field of the schema that a document does not provide as expected
+@dataclass(frozen=True)
+class FieldIssue:
+    label: str
+    problem: str  # 'missing', 'unanswered', 'not a value' or 'type'
+    detail: str
+
+    def __str__(self):
+        return f"{self.label}: {self.detail}"
+
+
+def _matches_type(value, field_type):
+    if field_type == 'text':
+        return isinstance(value, str)
+    if field_type == 'boolean':
+        return isinstance(value, bool) or (isinstance(value, str) and value.strip().lower() in BOOLEAN_TEXTS)
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, str):
+        try:
+            number = float(value.replace(',', '.'))
+        except ValueError:
+            return False
+        return field_type == 'number' or number.is_integer()
+    if field_type == 'integer':
+        return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+    return isinstance(value, (int, float))
+
+
+class FieldSchema:
+    """Ordered fields with their accessors, compiled once."""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._by_label = {}
+        for spec in self.fields:
+            if spec.label in self._by_label:
+                raise SchemaError(f"duplicate label {spec.label!r}")
+            self._by_label[spec.label] = spec
+        self._accessors = tuple((spec.label, compile_accessor(spec.path)) for spec in self.fields)
+
+    def __reduce__(self):
+        # Accessors are closures: rebuild them in the worker processes of a batch
+        return (FieldSchema, (self.fields,))
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __contains__(self, label):
+        return label in self._by_label
+
+    def __getitem__(self, label):
+        return self._by_label[label]
+
+    @property
+    def labels(self):
+        return [spec.label for spec in self.fields]
+
+    def multiline_labels(self):
+        return [spec.label for spec in self.fields if spec.multiline]
+
+    def flat_mapping(self):
+        """{label: flattened key}, for extract_from_flattened()."""
+        return {spec.label: spec.flat_key for spec in self.fields}
+
+    def extract(self, document, default, selected_fields=None):
+        """{label: value} for the fields (or the selected ones), default where the document has no value."""
+        return {
+            label: accessor(document, default)
+            for label, accessor in self._accessors
+            if selected_fields is None or label in selected_fields
+        }
+
+    def check(self, document):
+        """Return a FieldIssue for each field the document does not provide as declared."""
+        issues = []
+        for spec in self.fields:
+            value = get_path(document, spec.path, _NOT_FOUND)
+            if value is _NOT_FOUND:
+                issues.append(self._missing(document, spec))
+            elif value is None or value == '':
+                issues.append(FieldIssue(spec.label, 'unanswered', "no answer"))
+            elif isinstance(value, (dict, list)):
+                issues.append(FieldIssue(spec.label, 'not a value', f"{'.'.join(map(str, spec.path))} is a {type(value).__name__}"))
+            elif not _matches_type(value, spec.type):
+                issues.append(FieldIssue(spec.label, 'type', f"expected {spec.type}, found {value!r}"))
+        return issues
+
+    def _missing(self, document, spec):
+        # Find where the path stops, to tell an unanswered question from a renamed one
+        for depth in range(len(spec.path) - 1, 0, -1):
+            if get_path(document, spec.path[:depth], _NOT_FOUND) is not _NOT_FOUND:
+                break
+        else:
+            depth = 0
+        if depth == len(spec.path) - 1:
+            return FieldIssue(spec.label, 'unanswered', f"no {spec.path[-1]!r} in {'.'.join(map(str, spec.path[:depth]))}")
+        return FieldIssue(spec.label, 'missing', f"no {spec.path[depth]!r} in {'.'.join(map(str, spec.path[:depth])) or 'the document'}")
+
+    def validate(self, sample_document):
+        """Raise SchemaError if a field path does not exist in sample_document (mapping drift)."""
+        missing = [issue for issue in self.check(sample_document) if issue.problem in ('missing', 'not a value')]
+        if missing:
+            raise SchemaError("fields not found in the sample document:\n" + "\n".join(f"  {issue}" for issue in missing))
@@ -0,0 +1,422 @@
+"""Persistent store of extracted audits (SQLite file).
+
+Site fields and requirement scorings of each audit are ingested once.
+Audits are stored with their COID, audit date and the SHA-256 of the file;
+the hash is unique, so ingesting a file already in the store is a no-op
+(checked before the file is parsed), while another export of the same
+COID and date is kept as a separate audit. Cross-audit questions such as
+"every KO or MAJOR on requirement 4.2.1" are indexed queries, and the
+explanations of every requirement are kept in a full-text index (SQLite
+FTS5, accent-insensitive, see ifsneo.textsearch) ranked with BM25.
+
+    python -m ifsneo.store ingest audits/ saison2024.zip
+    python -m ifsneo.store findings --num 4.2.1
+    python -m ifsneo.store search allergènes --scores C D MAJOR KO
+    python -m ifsneo.store audits --db /data/audits.sqlite
+
+The store lives in IFSNEO_STORE (default: audits.sqlite in the ifsneo
+cache folder, see ifsneo.refstore). An AuditStore can be shared by threads
+(e.g. the sessions of a Streamlit server, see shared_store()): its single
+connection is used by one thread at a time.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from ifsneo.batch import content_digest, extract_batch
+from ifsneo.extraction import MISSING
+from ifsneo.matrix import NON_CONFORMITY_SCORES
+from ifsneo.refstore import cache_dir
+from ifsneo.textsearch import index_text, match_query
+
+SCHEMA_VERSION = 5
+
+# {path: AuditStore} shared by the threads of the process
+_shared_stores = {}
+_shared_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audits (
+    id INTEGER PRIMARY KEY,
+    module TEXT,
+    coid TEXT,
+    audit_date TEXT,
+    sha256 TEXT NOT NULL UNIQUE,
+    source TEXT,
+    ingested_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS audits_coid ON audits (coid, audit_date);
+
+-- Counter bumped whenever an audit is added or removed; audit ids are reused
+-- after a removal, so they cannot tell two states of the store apart
+CREATE TABLE IF NOT EXISTS store_revision (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    revision INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_revision (id, revision) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS audits_insert_revision AFTER INSERT ON audits BEGIN
+    UPDATE store_revision SET revision = revision + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS audits_delete_revision AFTER DELETE ON audits BEGIN
+    UPDATE store_revision SET revision = revision + 1;
+END;
+
+CREATE TABLE IF NOT EXISTS site_fields (
+    audit_id INTEGER NOT NULL REFERENCES audits (id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (audit_id, field)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS scorings (
+    audit_id INTEGER NOT NULL REFERENCES audits (id) ON DELETE CASCADE,
+    uuid TEXT NOT NULL,
+    num TEXT,
+    score TEXT,
+    explanation TEXT,
+    detailed_explanation TEXT,
+    response TEXT,
+    PRIMARY KEY (audit_id, uuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scorings_num_score ON scorings (num, score);
+CREATE INDEX IF NOT EXISTS scorings_score ON scorings (score);
+
+-- Aggregates kept up to date by the triggers below, so the analytics never scan scorings
+CREATE TABLE IF NOT EXISTS requirement_score_counts (
+    uuid TEXT NOT NULL,
+    score TEXT NOT NULL,
+    num TEXT,
+    audits INTEGER NOT NULL,
+    PRIMARY KEY (uuid, score)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS audit_score_counts (
+    audit_id INTEGER NOT NULL REFERENCES audits (id) ON DELETE CASCADE,
+    score TEXT NOT NULL,
+    requirements INTEGER NOT NULL,
+    PRIMARY KEY (audit_id, score)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS scorings_insert AFTER INSERT ON scorings BEGIN
+    INSERT INTO requirement_score_counts (uuid, score, num, audits)
+    VALUES (NEW.uuid, coalesce(NEW.score, 'N/A'), NEW.num, 1)
+    ON CONFLICT (uuid, score) DO UPDATE SET audits = audits + 1;
+    INSERT INTO audit_score_counts (audit_id, score, requirements)
+    VALUES (NEW.audit_id, coalesce(NEW.score, 'N/A'), 1)
+    ON CONFLICT (audit_id, score) DO UPDATE SET requirements = requirements + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS scorings_delete AFTER DELETE ON scorings BEGIN
+    UPDATE requirement_score_counts SET audits = audits - 1
+    WHERE uuid = OLD.uuid AND score = coalesce(OLD.score, 'N/A');
+    DELETE FROM requirement_score_counts WHERE audits <= 0;
+END;
+
+-- Inverted index of the explanations: one row per scoring with text, holding
+-- the normalised terms of both explanations (ifsneo.textsearch.index_text)
+CREATE VIRTUAL TABLE IF NOT EXISTS explanations USING fts5 (
+    terms,
+    audit_id UNINDEXED,
+    uuid UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Rebuilds the aggregates from the scorings, for stores created before they existed
+REBUILD_AGGREGATES = """
+DELETE FROM requirement_score_counts;
+DELETE FROM audit_score_counts;
+INSERT INTO requirement_score_counts (uuid, score, num, audits)
+    SELECT uuid, coalesce(score, 'N/A'), max(num), count(*) FROM scorings GROUP BY uuid, coalesce(score, 'N/A');
+INSERT INTO audit_score_counts (audit_id, score, requirements)
+    SELECT audit_id, coalesce(score, 'N/A'), count(*) FROM scorings GROUP BY audit_id, coalesce(score, 'N/A');
+"""
+
+# Indexes the explanations of the scorings, for stores created before the full-text index
+INDEX_SCORINGS = 'SELECT audit_id, uuid, explanation, detailed_explanation FROM scorings'
+
+# Columns of the checklist_table() DataFrame, in the order of the scorings table
+_SCORING_SOURCE_COLUMNS = ['UUID', 'Num', 'Score', 'Explanation', 'Detailed Explanation', 'Response']
+
+
+def default_store_path():
+    return os.environ.get('IFSNEO_STORE') or os.path.join(cache_dir(), 'audits.sqlite')
+
+
+def _text(value):
+    if value is None or value == MISSING or value != value:  # NaN is the only value not equal to itself
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+class AuditStore:
+    """SQLite file holding the extracted audits; usable as a context manager."""
+
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Streamlit runs each rerun in its own thread: every use of the
+        # connection holds _lock, so that a transaction of one thread is never
+        # committed or rolled back by another
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        with self.connection:
+            if 0 < version < 3:
+                # Stores created before mixed NEO modules only hold food_8 audits
+                self.connection.execute('ALTER TABLE audits ADD COLUMN module TEXT')
+                self.connection.execute("UPDATE audits SET module = 'food_8'")
+            self.connection.executescript(SCHEMA)
+            if 0 < version < 2:
+                self.connection.executescript(REBUILD_AGGREGATES)
+            if 0 < version < 4:
+                self._index(self.connection.execute(INDEX_SCORINGS).fetchall())
+            self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _query(self, query, params=()):
+        # Rows of a read query, as dicts
+        with self._lock:
+            return [dict(row) for row in self.connection.execute(query, params)]
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute('SELECT count(*) FROM audits').fetchone()[0]
+
+    def audit_id(self, digest):
+        """Id of the audit whose file has this SHA-256, or None."""
+        with self._lock:
+            row = self.connection.execute('SELECT id FROM audits WHERE sha256 = ?', (digest,)).fetchone()
+        return row[0] if row else None
+
+    def add_result(self, result):
+        """Store a successful AuditResult; return (audit id, True if it was added)."""
+        if not result.ok:
+            raise ValueError(f"{result.name} was not extracted: {result.error}")
+        with self._lock, self.connection:
+            existing = self.audit_id(result.digest)
+            if existing is not None:
+                return existing, False
+            cursor = self.connection.execute(
+                'INSERT INTO audits (module, coid, audit_date, sha256, source, ingested_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (result.module, _text(result.coid), _text(result.audit_date), result.digest, result.name,
+                 datetime.now(timezone.utc).isoformat(timespec='seconds'))
+            )
+            audit_id = cursor.lastrowid
+            self.connection.executemany(
+                'INSERT INTO site_fields (audit_id, field, value) VALUES (?, ?, ?)',
+                ((audit_id, label, _text(value)) for label, value in result.fields.items())
+            )
+            table = result.requirements[_SCORING_SOURCE_COLUMNS]
+            # A UUID scored twice keeps its first scoring, as INSERT OR IGNORE would, so that
+            # the full-text index holds the same rows as scorings
+            rows = {}
+            for values in table.itertuples(index=False, name=None):
+                row = (audit_id, *map(_text, values))
+                rows.setdefault(row[1], row)
+            rows = list(rows.values())
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO scorings (audit_id, uuid, num, score, explanation, detailed_explanation, response)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._index((row[0], row[1], row[4], row[5]) for row in rows)
+        return audit_id, True
+
+    def _index(self, scorings):
+        # (audit_id, uuid, explanation, detailed_explanation) rows, scorings without text are not indexed
+        rows = []
+        for audit_id, uuid, explanation, detailed_explanation in scorings:
+            terms = index_text(explanation, detailed_explanation)
+            if terms:
+                rows.append((terms, audit_id, uuid))
+        self.connection.executemany('INSERT INTO explanations (terms, audit_id, uuid) VALUES (?, ?, ?)', rows)
+
+    def ingest(self, sources, uuid_mapping_df=None, max_workers=None, progress=None):
+        """Extract and store the (name, path or bytes) sources not already in the store.
+
+        uuid_mapping_df and progress(done, total) are passed to extract_batch
+        (uuid_mapping_df None: reference file of each NEO module).
+
+        Returns the AuditResults of the files that were extracted; files
+        already in the store are skipped without being parsed.
+        """
+        pending = [(name, source) for name, source in sources if self.audit_id(content_digest(source)) is None]
+        results = extract_batch(pending, uuid_mapping_df, max_workers=max_workers, progress=progress)
+        for result in results:
+            if result.ok:
+                self.add_result(result)
+        return results
+
+    def audits(self, coid=None):
+        """Stored audits (id, module, coid, audit_date, source, ingested_at), most recent audit first."""
+        query = 'SELECT id, module, coid, audit_date, source, ingested_at FROM audits'
+        params = ()
+        if coid is not None:
+            query += ' WHERE coid = ?'
+            params = (str(coid),)
+        query += ' ORDER BY audit_date DESC, id DESC'
+        return self._query(query, params)
+
+    def site_fields(self, audit_id):
+        """{field: value} of one audit."""
+        rows = self._query('SELECT field, value FROM site_fields WHERE audit_id = ?', (audit_id,))
+        return {row['field']: row['value'] for row in rows}
+
+    def findings(self, num=None, uuid=None, scores=NON_CONFORMITY_SCORES, coid=None):
+        """Scorings with one of the scores across every stored audit, optionally for one requirement or site."""
+        conditions = [f"s.score IN ({', '.join('?' * len(scores))})"]
+        params = list(scores)
+        for column, value in (('s.num', num), ('s.uuid', uuid), ('a.coid', coid)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(str(value))
+        query = (
+            'SELECT a.coid, a.audit_date, a.source, s.num, s.uuid, s.score, s.explanation, s.detailed_explanation'
+            ' FROM scorings s JOIN audits a ON a.id = s.audit_id'
+            f" WHERE {' AND '.join(conditions)}"
+            ' ORDER BY s.num, a.coid, a.audit_date'
+        )
+        return self._query(query, params)
+
+    def search(self, query, limit=50, scores=None, coid=None):
+        """Scorings whose explanations contain every word of query, best match (BM25) first.
+
+        Matching ignores case and accents and covers French and English
+        plurals; the last word also matches as a prefix ("allerg").
+        """
+        expression = match_query(query)
+        if expression is None:
+            return []
+        conditions = ['explanations MATCH ?']
+        params = [expression]
+        if scores is not None:
+            conditions.append(f"s.score IN ({', '.join('?' * len(scores))})")
+            params.extend(scores)
+        if coid is not None:
+            conditions.append('a.coid = ?')
+            params.append(str(coid))
+        query = (
+            'SELECT a.coid, a.audit_date, a.source, s.num, s.uuid, s.score, s.explanation, s.detailed_explanation,'
+            ' bm25(explanations) AS rank'
+            ' FROM explanations e'
+            ' JOIN scorings s ON s.audit_id = e.audit_id AND s.uuid = e.uuid'
+            ' JOIN audits a ON a.id = e.audit_id'
+            f" WHERE {' AND '.join(conditions)}"
+            ' ORDER BY rank LIMIT ?'
+        )
+        params.append(limit)
+        return self._query(query, params)
+
+    def revision(self):
+        """Value that changes whenever audits are added or removed (cache key for the analytics)."""
+        with self._lock:
+            return self.connection.execute('SELECT revision FROM store_revision').fetchone()[0]
+
+    def requirement_score_counts(self, scores=None):
+        """Rows (uuid, num, score, audits): number of audits giving each score to each requirement."""
+        query = 'SELECT uuid, num, score, audits FROM requirement_score_counts'
+        params = ()
+        if scores is not None:
+            query += f" WHERE score IN ({', '.join('?' * len(scores))})"
+            params = tuple(scores)
+        return self._query(query, params)
+
+    def audit_score_counts(self, coid=None):
+        """Rows (audit_id, coid, audit_date, source, score, requirements), oldest audit first."""
+        query = (
+            'SELECT a.id AS audit_id, a.coid, a.audit_date, a.source, c.score, c.requirements'
+            ' FROM audit_score_counts c JOIN audits a ON a.id = c.audit_id'
+        )
+        params = ()
+        if coid is not None:
+            query += ' WHERE a.coid = ?'
+            params = (str(coid),)
+        query += ' ORDER BY a.coid, a.audit_date, a.id'
+        return self._query(query, params)
+
+    def remove(self, audit_id):
+        """Delete an audit and its data."""
+        with self._lock, self.connection:
+            self.connection.execute('DELETE FROM explanations WHERE audit_id = ?', (audit_id,))
+            self.connection.execute('DELETE FROM audits WHERE id = ?', (audit_id,))
+
+
+def shared_store(path=None):
+    """The AuditStore of path (default_store_path() by default) shared by every thread of the process."""
+    path = path or default_store_path()
+    with _shared_lock:
+        store = _shared_stores.get(path)
+        if store is None:
+            store = _shared_stores[path] = AuditStore(path)
+        return store
+
+
+def main(argv=None):
+    import argparse
+    import csv
+    import sys
+
+    db_help = "store file (default: IFSNEO_STORE or the ifsneo cache folder)"
+    parser = argparse.ArgumentParser(prog='python -m ifsneo.store', description="Persistent store of extracted audits")
+    # --db is accepted before or after the command; SUPPRESS keeps a --db given before it
+    parser.add_argument('--db', help=db_help)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=argparse.SUPPRESS, help=db_help)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = subparsers.add_parser('ingest', parents=[common], help="add .ifs files, folders or zip archives")
+    ingest_parser.add_argument('inputs', nargs='+')
+    ingest_parser.add_argument('-j', '--workers', type=int, default=None, help="number of worker processes")
+    findings_parser = subparsers.add_parser('findings', parents=[common], help="non-conformities across the stored audits (csv)")
+    findings_parser.add_argument('--num', help="requirement number, e.g. 4.2.1")
+    findings_parser.add_argument('--coid', help="a single site")
+    findings_parser.add_argument('--scores', nargs='+', default=list(NON_CONFORMITY_SCORES), help="scores to list")
+    search_parser = subparsers.add_parser('search', parents=[common], help="full-text search in the explanations (csv)")
+    search_parser.add_argument('query', nargs='+', help="words to find")
+    search_parser.add_argument('--limit', type=int, default=50)
+    search_parser.add_argument('--coid', help="a single site")
+    search_parser.add_argument('--scores', nargs='+', help="only these scores")
+    subparsers.add_parser('audits', parents=[common], help="list the stored audits (csv)")
+    args = parser.parse_args(argv)
+
+    with AuditStore(args.db) as store:
+        if args.command == 'ingest':
+            from ifsneo.batch import iter_sources
+
+            results = store.ingest(iter_sources(args.inputs), max_workers=args.workers)
+            for result in results:
+                print(f"{result.name}\t{result.coid}\t{'ok' if result.ok else 'ERREUR ' + result.error}")
+            failures = sum(1 for result in results if not result.ok)
+            print(f"{len(results) - failures} audit(s) ajouté(s), {len(store)} dans {store.path}")
+            return 1 if failures else 0
+        if args.command == 'findings':
+            rows = store.findings(num=args.num, coid=args.coid, scores=args.scores)
+        elif args.command == 'search':
+            rows = store.search(' '.join(args.query), limit=args.limit, scores=args.scores, coid=args.coid)
+        else:
+            rows = store.audits()
+        if rows:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
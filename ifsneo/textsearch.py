@@ -0,0 +1,53 @@
+# Normalisation of the auditor texts for the full-text index of the audit store.
+# Texts are written in French or English: words are lower-cased, stripped of
+# their accents, common words of both languages are dropped and the plural
+# and final e are removed, so that "allergènes", "Allergene" and "allergens"
+# are all indexed as "allergen". Queries go through the same normalisation.
+import re
+import unicodedata
+
+_WORD = re.compile(r'[^\W_]+')
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have in into is it its of on or that the their there these this
+to was were which with without not no yes
+au aux avec ce ces cet cette dans de des du elle en est et il ils la le les leur lui mais ne nous ou par pas
+pour qu que qui sa se ses son sont sur un une vous y d l n s c j m t
+""".split())
+
+
+def strip_accents(text):
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def stem(word):
+    """Light French / English stemming: plural, then final e."""
+    if len(word) > 3 and word[-1] in 'sx' and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    if len(word) > 4 and word.endswith('e') and not word.endswith('ee'):
+        word = word[:-1]
+    return word
+
+
+def terms(text):
+    """Index terms of text, in order (repeated terms are kept, for ranking)."""
+    if not text:
+        return []
+    words = _WORD.findall(strip_accents(str(text)).casefold())
+    return [stem(word) for word in words if word not in STOPWORDS and (len(word) > 1 or word.isdigit())]
+
+
+def index_text(*texts):
+    """Text stored in the index for the given texts."""
+    return ' '.join(term for text in texts for term in terms(text))
+
+
+def match_query(query):
+    """FTS5 MATCH expression of a user query: every term, the last one as a prefix; None if no term."""
+    query_terms = terms(query)
+    if not query_terms:
+        return None
+    # Quoted terms: a term is never read as an FTS5 operator (AND, NOT, NEAR...)
+    quoted = [f'"{term}"' for term in query_terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
@@ -0,0 +1,196 @@
+"""Timing spans around the stages of a page run or a job.
+
+A Profiler collects the spans of one run (a Streamlit rerun, a batch job).
+Library functions on the hot path are wrapped with ``@timed``; pages and
+scripts add their own stages with ``span()``:
+
+    with Profiler('NEOEXTRACTv2') as profiler:
+        with span('html table', rows=len(rows)):
+            ...
+    profiler.records()   # [{'span': 'document parse', 'ms': 41.2, ...}, ...]
+
+Outside a profiler, spans cost one context variable lookup. Each finished
+span is logged as JSON on the ``ifsneo.timing`` logger (DEBUG), and the
+whole run at INFO; with ``IFSNEO_TIMING_LOG`` set, the records of each run
+are also appended to that file as JSON lines. The memory of each span
+(tracemalloc peak above the memory in use when the span started) is only
+measured with ``trace_memory=True``, as tracing slows Python down.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger('ifsneo.timing')
+
+SESSION_KEY = 'ifsneo_profiler'
+
+_current = contextvars.ContextVar('ifsneo_profiler', default=None)
+
+
+def timing_log_path():
+    return os.environ.get('IFSNEO_TIMING_LOG')
+
+
+def debug_enabled(query_params=None):
+    """True when the debug panel is requested (IFSNEO_DEBUG=1 or ?debug=1 in the page URL)."""
+    values = [os.environ.get('IFSNEO_DEBUG', '')]
+    if query_params is not None:
+        values.append(query_params.get('debug', ''))
+    return any(str(value).lower() in ('1', 'true', 'yes') for value in values)
+
+
+class Profiler:
+    """Spans of one run, in the order they finished."""
+
+    def __init__(self, run, trace_memory=False):
+        self.run = run
+        self.trace_memory = trace_memory
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.spans = []
+        self._stack = []
+        self._token = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.finish()
+
+    def start(self):
+        """Make this profiler the active one in the current context."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._token = _current.set(self)
+        return self
+
+    def finish(self):
+        """Stop collecting, then log and export the records of the run."""
+        if self._token is None:
+            return
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Started in another context (thread): it is not active here
+            pass
+        self._token = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        records = self.records()
+        logger.info(json.dumps({'run': self.run, 'ms': round(self.total_seconds() * 1000, 3), 'spans': records}, default=str))
+        path = timing_log_path()
+        if path:
+            with open(path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(dict(record, started_at=self.started_at), default=str) + '\n')
+
+    def total_seconds(self):
+        # Top-level spans only: nested ones are already counted in their parent
+        return sum(record['seconds'] for record in self.spans if record['depth'] == 0)
+
+    @contextmanager
+    def span(self, name, **fields):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # The peak is reset for this span: keep the parent's peak so far
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+        frame = {'name': name, 'memory': current if tracing else 0, 'peak': 0}
+        parent = self._stack[-1]['name'] if self._stack else None
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            record = {
+                'run': self.run,
+                'span': name,
+                'parent': parent,
+                'depth': len(self._stack),
+                'start_ms': round((start - self._origin) * 1000, 3),
+                'seconds': seconds,
+                'ms': round(seconds * 1000, 3),
+            }
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(frame['peak'], peak)
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+                record['peak_mb'] = round((peak - frame['memory']) / 1e6, 3)
+                record['retained_mb'] = round((current - frame['memory']) / 1e6, 3)
+            record.update(fields)
+            self.spans.append(record)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(json.dumps(record, default=str))
+
+    def records(self):
+        """The spans as JSON-serialisable dicts (extra fields included)."""
+        return [{key: value for key, value in record.items() if key != 'seconds'} for record in self.spans]
+
+    def table(self):
+        """DataFrame of the spans in start order, indented by nesting."""
+        import pandas as pd
+
+        rows = []
+        for record in sorted(self.spans, key=lambda record: record['start_ms']):
+            row = {'Étape': '· ' * record['depth'] + record['span'], 'ms': record['ms']}
+            if 'peak_mb' in record:
+                row['Pic mémoire (Mo)'] = record['peak_mb']
+                row['Mémoire conservée (Mo)'] = record['retained_mb']
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def current_profiler():
+    return _current.get()
+
+
+def page_profiler(page, session_state, trace_memory=False):
+    """Start the Profiler of a Streamlit rerun of page, kept in session_state.
+
+    A rerun interrupted by a widget change never reaches its finish(): the
+    profiler it left behind is finished here instead.
+    """
+    previous = session_state.get(SESSION_KEY)
+    if previous is not None:
+        previous.finish()
+    profiler = Profiler(page, trace_memory=trace_memory).start()
+    session_state[SESSION_KEY] = profiler
+    return profiler
+
+
+@contextmanager
+def span(name, **fields):
+    """Time the enclosed block in the active profiler, if any."""
+    profiler = _current.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.span(name, **fields):
+        yield
+
+
+def timed(name):
+    """Decorator: run the function inside span(name)."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _current.get()
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
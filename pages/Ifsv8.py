@@ -2,100 +2,14 @@ import json
 import pandas as pd
 import streamlit as st
 from io import BytesIO
+from ifsneo import UnsupportedModuleError, detect_module, extract_from_document, session_document_cache
+from ifsneo.exports import excel_engine
+from ifsneo.timing import debug_enabled, page_profiler, span
+from widgets import display_table_page
 
-# Function to flatten the nested JSON structure
-def flatten_json_safe(nested_json, parent_key='', sep='_'):
-    """Flatten a nested JSON dictionary, safely handling strings and primitives."""
-    items = []
-    if isinstance(nested_json, dict):
-        for k, v in nested_json.items():
-            new_key = f'{parent_key}{sep}{k}' if parent_key else k
-            if isinstance(v, dict):
-                items.extend(flatten_json_safe(v, new_key, sep=sep).items())
-            elif isinstance(v, list):
-                for i, item in enumerate(v):
-                    items.extend(flatten_json_safe(item, f'{new_key}{sep}{i}', sep=sep).items())
-            else:
-                items.append((new_key, v))
-    else:
-        items.append((parent_key, nested_json))
-    return dict(items)
-
-# Function to extract data from the flattened JSON
-def extract_from_flattened(flattened_data, mapping):
-    extracted_data = {}
-    for label, flat_path in mapping.items():
-        extracted_data[label] = flattened_data.get(flat_path, 'N/A')
-    return extracted_data
-
-# Custom CSS for the table display
-def apply_table_css():
-    st.markdown(
-        """
-        <style>
-        table {
-            width: 100%;
-            border-collapse: collapse;
-            background-color: #f9f9f9;
-        }
-        th, td {
-            border: 1px solid #ddd;
-            padding: 10px;
-            text-align: left;
-        }
-        th {
-            background-color: #f2f2f2;
-        }
-        </style>
-        """, unsafe_allow_html=True
-    )
-
-# Function to display the extracted data as an HTML table
-def display_extracted_data(extracted_data):
-    apply_table_css()
-    table_html = "<table><thead><tr><th>Field</th><th>Value</th></tr></thead><tbody>"
-    for field, value in extracted_data.items():
-        table_html += f"<tr><td>{field}</td><td>{value}</td></tr>"
-    table_html += "</tbody></table>"
-    st.markdown(table_html, unsafe_allow_html=True)
-
-# Complete mapping based on your provided field names and JSON structure
-FLATTENED_FIELD_MAPPING = {
-    "Nom du site à auditer": "data_modules_food_8_questions_companyName_answer",
-    "N° COID du portail": "data_modules_food_8_questions_companyCoid_answer",
-    "Code GLN": "data_modules_food_8_questions_companyGln_answer_0_rootQuestions_companyGlnNumber_answer",
-    "Rue": "data_modules_food_8_questions_companyStreetNo_answer",
-    "Code postal": "data_modules_food_8_questions_companyZip_answer",
-    "Nom de la ville": "data_modules_food_8_questions_companyCity_answer",
-    "Pays": "data_modules_food_8_questions_companyCountry_answer",
-    "Téléphone": "data_modules_food_8_questions_companyTelephone_answer",
-    "Latitude": "data_modules_food_8_questions_companyGpsLatitude_answer",
-    "Longitude": "data_modules_food_8_questions_companyGpsLongitude_answer",
-    "Email": "data_modules_food_8_questions_companyEmail_answer",
-    "Nom du siège social": "data_modules_food_8_questions_headquartersName_answer",
-    "Rue (siège social)": "data_modules_food_8_questions_headquartersStreetNo_answer",
-    "Nom de la ville (siège social)": "data_modules_food_8_questions_headquartersCity_answer",
-    "Code postal (siège social)": "data_modules_food_8_questions_headquartersZip_answer",
-    "Pays (siège social)": "data_modules_food_8_questions_headquartersCountry_answer",
-    "Téléphone (siège social)": "data_modules_food_8_questions_headquartersTelephone_answer",
-    "Surface couverte de l'entreprise (m²)": "data_modules_food_8_questions_productionAreaSize_answer",
-    "Nombre de bâtiments": "data_modules_food_8_questions_numberOfBuildings_answer",
-    "Nombre de lignes de production": "data_modules_food_8_questions_numberOfProductionLines_answer",
-    "Nombre d'étages": "data_modules_food_8_questions_numberOfFloors_answer",
-    "Nombre maximum d'employés dans l'année, au pic de production": "data_modules_food_8_questions_numberOfEmployeesForTimeCalculation_answer",
-    "Langue parlée et écrite sur le site": "data_modules_food_8_questions_workingLanguage_answer",
-    "Périmètre de l'audit": "data_modules_food_8_questions_scopeCertificateScopeDescription_en_answer",
-    "Process et activités": "data_modules_food_8_questions_scopeProductGroupsDescription_answer",
-    "Activité saisonnière ? (O/N)": "data_modules_food_8_questions_seasonalProduction_answer",
-    "Une partie du procédé de fabrication est-elle sous traitée? (OUI/NON)": "data_modules_food_8_questions_partlyOutsourcedProcesses_answer",
-    "Si oui lister les procédés sous-traités": "data_modules_food_8_questions_partlyOutsourcedProcessesDescription_answer",
-    "Avez-vous des produits totalement sous-traités? (OUI/NON)": "data_modules_food_8_questions_fullyOutsourcedProducts_answer",
-    "Si oui, lister les produits totalement sous-traités": "data_modules_food_8_questions_fullyOutsourcedProductsDescription_answer",
-    "Avez-vous des produits de négoce? (OUI/NON)": "data_modules_food_8_questions_tradedProductsBrokerActivity_answer",
-    "Si oui, lister les produits de négoce": "data_modules_food_8_questions_tradedProductsBrokerActivityDescription_answer",
-    "Produits à exclure du champ d'audit (OUI/NON)": "data_modules_food_8_questions_exclusions_answer",
-    "Préciser les produits à exclure": "data_modules_food_8_questions_exclusionsDescription_answer"
-}
+# Time the stages of this rerun; ?debug=1 in the URL shows them in the sidebar
+show_timings = debug_enabled(st.query_params)
+profiler = page_profiler("Ifsv8", st.session_state, trace_memory=show_timings)
 
 # Streamlit app
 st.title("IFS NEO Form Data Extractor")
@@ -105,31 +19,41 @@ uploaded_json_file = st.file_uploader("Charger le fichier IFS de NEO", type="ifs
 
 if uploaded_json_file:
     try:
-        # Step 2: Load the uploaded JSON file
-        json_data = json.load(uploaded_json_file)
-
-        # Step 3: Flatten the JSON data
-        flattened_json_data_safe = flatten_json_safe(json_data)
-
-        # Step 4: Extract the required data based on the mapping
-        extracted_data = extract_from_flattened(flattened_json_data_safe, FLATTENED_FIELD_MAPPING)
-
-        # Step 5: Display the extracted data as an HTML table
+        # Step 2: Load the uploaded JSON file (parsed once per content, reused on reruns)
+        cached_document = session_document_cache(st.session_state).load(uploaded_json_file.getvalue())
+        json_data = cached_document.document
+
+        # Step 3: Extract the required data based on the mapping of the NEO module of the audit
+        report_schema = detect_module(json_data).report_schema
+        extracted_data = extract_from_document(json_data, report_schema)
+        issues = cached_document.derived('report_schema_issues', lambda: [issue for issue in report_schema.check(json_data) if issue.problem != 'unanswered'])
+        if issues:
+            with st.expander(f"⚠️ {len(issues)} field(s) not found or of an unexpected type in this file"):
+                for issue in issues:
+                    st.write(f"- {issue}")
+
+        # Step 4: Display the extracted data, one page at a time
         st.subheader("Extracted Data")
-        display_extracted_data(extracted_data)
-
-        # Step 6: Option to download the extracted data as an Excel file
         df = pd.DataFrame(list(extracted_data.items()), columns=["Field", "Value"])
+        display_table_page(df, "fields")
+
+        # Step 5: Option to download the extracted data as an Excel file
         output = BytesIO()
-        df.to_excel(output, index=False)
+        with span("excel site data"):
+            df.to_excel(output, index=False, engine=excel_engine())
         output.seek(0)
         
         st.download_button(label="Télécharger le fichier Excel", data=output, file_name='extracted_data.xlsx')
 
     except json.JSONDecodeError:
         st.error("Error decoding the JSON file. Please ensure it is in the correct format.")
+    except UnsupportedModuleError as e:
+        st.error(f"Unsupported NEO module: {e}")
 else:
     st.write(" Le fichier de NEO doit être un (.ifs) ")
 
-
-
+# Debug panel: time and memory of each stage of this rerun
+profiler.finish()
+if show_timings:
+    st.sidebar.subheader("Temps d'exécution")
+    st.sidebar.dataframe(profiler.table(), hide_index=True)
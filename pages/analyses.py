@@ -0,0 +1,132 @@
+import pandas as pd
+import streamlit as st
+from ifsneo import ReferenceDataError, get_uuid_mapping, prefetch_references
+from ifsneo.analytics import score_distribution, site_trend, top_non_conformities
+from ifsneo.batch import uploaded_sources
+from ifsneo.jobs import CANCELLED, DONE, FAILED
+from ifsneo.matrix import NON_CONFORMITY_SCORES
+from ifsneo.refstore import reference_digest
+from ifsneo.store import shared_store
+from ifsneo.timing import debug_enabled, page_profiler, span
+from widgets import poll_job, session_job
+
+# Set Streamlit to wide mode
+st.set_page_config(layout="wide")
+
+# Time the stages of this rerun; ?debug=1 in the URL shows them in the sidebar
+show_timings = debug_enabled(st.query_params)
+profiler = page_profiler("analyses", st.session_state, trace_memory=show_timings)
+
+# Start downloading the reference files in the background while the page is displayed
+prefetch_references()
+
+# Function run as a background job: extraction of the files not in the store yet, then their storage
+def ingest_audits(store, uploaded_files, uuid_mapping_df, progress):
+    progress(0, "Extraction des audits")
+    return store.ingest(uploaded_sources(uploaded_files), uuid_mapping_df, progress=lambda done, total: progress(done / total, f"{done}/{total} fichiers extraits"))
+
+# The tables are cached per store revision and version of the mapping: they are only
+# recomputed after audits are added or removed, or when the mapping is refreshed
+@st.cache_data
+def cached_distribution(revision, mapping_digest, level, _store, _uuid_mapping_df):
+    return score_distribution(_store, _uuid_mapping_df, level)
+
+@st.cache_data
+def cached_top_non_conformities(revision, mapping_digest, limit, _store, _uuid_mapping_df):
+    return top_non_conformities(_store, _uuid_mapping_df, limit=limit)
+
+@st.cache_data
+def cached_site_trend(revision, coid, _store):
+    return site_trend(_store, coid)
+
+# The audit store is opened once per server process and shared by the sessions
+store = shared_store()
+
+# Streamlit app
+st.title("Analyses multi-audits")
+
+# Load the CSV mapping for UUIDs corresponding to NUM, after the first elements of the page are displayed
+try:
+    with st.spinner("Chargement des données de référence..."), span("reference data"):
+        UUID_MAPPING_DF = get_uuid_mapping()
+        # Version of the mapping, to key the tables joined with it
+        UUID_MAPPING_DIGEST = reference_digest('uuid_mapping', UUID_MAPPING_DF)
+except ReferenceDataError as e:
+    st.error(str(e))
+    UUID_MAPPING_DF = pd.DataFrame()
+
+# Step 1: Add audits to the store (files already in the store are skipped)
+with st.sidebar:
+    st.subheader("Ajouter des audits")
+    uploaded_files = st.file_uploader("Fichiers IFS de NEO (ou archives zip)", type=["ifs", "zip"], accept_multiple_files=True)
+    if uploaded_files and not UUID_MAPPING_DF.empty:
+        # The files are added in the background, once per upload
+        job_key = ("ingest", store.path, tuple(uploaded_file.file_id for uploaded_file in uploaded_files), UUID_MAPPING_DIGEST)
+        job = session_job(job_key, 'ingest_job', "Ajouter à la base", ingest_audits, store, uploaded_files, UUID_MAPPING_DF, name="store ingest")
+        if job is not None and not job.finished:
+            poll_job(job)
+        elif job is not None and job.status == FAILED:
+            st.error(f"Échec de l'ajout à la base : {job.error}")
+        elif job is not None and job.status == CANCELLED:
+            st.info("Ajout à la base annulé.")
+        elif job is not None and job.status == DONE:
+            added = sum(1 for result in job.result if result.ok)
+            st.success(f"{added} audit(s) ajouté(s) ({len(uploaded_files)} fichier(s) chargé(s))")
+            for result in job.result:
+                if not result.ok:
+                    st.warning(f"{result.name} : {result.error}")
+
+revision = store.revision()
+audits = store.audits()
+if not audits:
+    st.info("La base ne contient aucun audit. Ajoutez des fichiers .ifs depuis la barre latérale.")
+elif UUID_MAPPING_DF.empty:
+    st.error("Impossible de charger les données des UUID. Veuillez vérifier l'URL.")
+else:
+    sites = sorted({audit['coid'] for audit in audits if audit['coid']})
+    col1, col2 = st.columns(2)
+    col1.metric("Audits", len(audits))
+    col2.metric("Sites", len(sites))
+
+    # Step 2: Score distribution per Chapitre / Thème / Sous-Thème
+    st.subheader("Répartition des notes")
+    level = st.selectbox("Regrouper par", ["Chapitre", "Theme", "SSTheme"])
+    with span("score distribution"):
+        distribution = cached_distribution(revision, UUID_MAPPING_DIGEST, level, store, UUID_MAPPING_DF)
+    st.bar_chart(distribution)
+    st.dataframe(distribution)
+
+    # Step 3: Requirements most often scored C, D, MAJOR or KO
+    st.subheader("Non-conformités les plus fréquentes")
+    limit = st.slider("Nombre d'exigences", min_value=5, max_value=100, value=20, step=5)
+    with span("top non-conformities"):
+        top = cached_top_non_conformities(revision, UUID_MAPPING_DIGEST, limit, store, UUID_MAPPING_DF)
+    st.dataframe(top, hide_index=True)
+
+    # Step 4: Trend of the scores of one site
+    st.subheader("Évolution par site")
+    if sites:
+        coid = st.selectbox("N° COID du site", sites)
+        with span("site trend"):
+            trend = cached_site_trend(revision, coid, store)
+        if len(trend) > 1:
+            st.line_chart(trend["Non-conformités"])
+        st.dataframe(trend)
+
+    # Step 5: Full-text search in the explanations of every stored audit
+    st.subheader("Recherche dans les explications")
+    col1, col2 = st.columns([3, 1])
+    query = col1.text_input("Mots recherchés (sans tenir compte des accents ni du pluriel)", placeholder="allergènes")
+    only_non_conformities = col2.checkbox("Non-conformités uniquement")
+    if query:
+        with span("full-text search"):
+            hits = store.search(query, limit=200, scores=NON_CONFORMITY_SCORES if only_non_conformities else None)
+        st.write(f"{len(hits)} résultat(s), du plus pertinent au moins pertinent.")
+        if hits:
+            st.dataframe(pd.DataFrame(hits).drop(columns=["uuid", "rank"]), hide_index=True)
+
+# Debug panel: time and memory of each stage of this rerun
+profiler.finish()
+if show_timings:
+    st.sidebar.subheader("Temps d'exécution")
+    st.sidebar.dataframe(profiler.table(), hide_index=True)
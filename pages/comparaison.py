@@ -0,0 +1,99 @@
+import json
+import pandas as pd
+import streamlit as st
+from io import BytesIO
+from ifsneo import ReferenceDataError, UnsupportedModuleError, detect_module, get_uuid_mapping, prefetch_references, session_document_cache
+from ifsneo.batch import COID_LABEL
+from ifsneo.diff import diff_documents, diff_frames, document_digests, write_diff_workbook
+from ifsneo.timing import debug_enabled, page_profiler, span
+
+# Set Streamlit to wide mode
+st.set_page_config(layout="wide")
+
+# Time the stages of this rerun; ?debug=1 in the URL shows them in the sidebar
+show_timings = debug_enabled(st.query_params)
+profiler = page_profiler("comparaison", st.session_state, trace_memory=show_timings)
+
+# Start downloading the reference files in the background while the page is displayed
+prefetch_references()
+
+# Function to load an upload with the digests of its sections, computed once per file
+def load_audit(uploaded_file):
+    cached_document = session_document_cache(st.session_state).load(uploaded_file.getvalue())
+    digests = cached_document.derived('diff_digests', lambda: document_digests(cached_document.document))
+    return cached_document.document, digests
+
+# Streamlit app
+st.title("Comparaison de deux audits IFS NEO")
+
+# Step 1: Upload the two audits of the site
+col1, col2 = st.columns(2)
+before_file = col1.file_uploader("Audit précédent", type="ifs")
+after_file = col2.file_uploader("Audit récent", type="ifs")
+
+# Load the CSV mapping for UUIDs corresponding to NUM, after the first elements of the page are displayed
+try:
+    with st.spinner("Chargement des données de référence..."), span("reference data"):
+        UUID_MAPPING_DF = get_uuid_mapping()
+except ReferenceDataError as e:
+    st.error(str(e))
+    UUID_MAPPING_DF = pd.DataFrame()
+
+if before_file and after_file and not UUID_MAPPING_DF.empty:
+    try:
+        # Step 2: Load both files (parsed and hashed once per content, reused on reruns)
+        before, before_digests = load_audit(before_file)
+        after, after_digests = load_audit(after_file)
+
+        # Step 3: Compare the site data and the requirements, skipping the identical sections
+        diff = diff_documents(before, after, UUID_MAPPING_DF, before_digests=before_digests, after_digests=after_digests)
+        site_df, requirements_df = diff_frames(diff)
+
+        site_schema = detect_module(after).site_schema
+        coids = [site_schema.extract(document, None, [COID_LABEL]).get(COID_LABEL) for document in (before, after)]
+        if coids[0] != coids[1]:
+            st.warning(f"Les deux audits ne portent pas sur le même site (COID {coids[0]} et {coids[1]}).")
+
+        # Step 4: Summary and details of the changes
+        if diff.unchanged:
+            st.success("Les deux audits sont identiques.")
+        metric1, metric2, metric3, metric4 = st.columns(4)
+        metric1.metric("Notes modifiées", len(diff.score_changes))
+        metric2.metric("Nouvelles non-conformités", len(diff.new_non_conformities))
+        metric3.metric("Non-conformités levées", len(diff.resolved_non_conformities))
+        metric4.metric("Données du site modifiées", len(diff.site_changes))
+
+        st.subheader("Exigences")
+        kinds = st.multiselect("Type de changement", sorted(requirements_df["Changement"].unique()))
+        st.dataframe(requirements_df[requirements_df["Changement"].isin(kinds)] if kinds else requirements_df, hide_index=True)
+
+        st.subheader("Données du site")
+        st.dataframe(site_df.astype(str), hide_index=True)
+
+        # Step 5: Option to download the comparison as an Excel file
+        output = BytesIO()
+        write_diff_workbook(diff, output)
+        output.seek(0)
+        st.download_button(
+            label="Télécharger la comparaison",
+            data=output,
+            file_name='comparaison_audits.xlsx',
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+    except json.JSONDecodeError:
+        st.error("Erreur lors du décodage du fichier JSON. Veuillez vous assurer qu'il est au format correct.")
+    except UnsupportedModuleError as e:
+        st.error(f"Module NEO non pris en charge : {e}")
+    except ValueError as e:
+        st.error(f"Comparaison impossible : {e}")
+elif UUID_MAPPING_DF.empty:
+    st.error("Impossible de charger les données des UUID. Veuillez vérifier l'URL.")
+else:
+    st.write("Chargez les deux fichiers de NEO (.ifs) du même site à comparer.")
+
+# Debug panel: time and memory of each stage of this rerun
+profiler.finish()
+if show_timings:
+    st.sidebar.subheader("Temps d'exécution")
+    st.sidebar.dataframe(profiler.table(), hide_index=True)
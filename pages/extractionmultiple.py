@@ -0,0 +1,106 @@
+import pandas as pd
+import streamlit as st
+from io import BytesIO
+from ifsneo import ReferenceDataError, get_uuid_mapping, prefetch_references
+from ifsneo.batch import batch_to_frames, extract_batch, uploaded_sources, write_batch_workbook
+from ifsneo.columnar import parquet_available, write_table
+from ifsneo.jobs import CANCELLED, DONE, FAILED
+from ifsneo.refstore import reference_digest
+from ifsneo.timing import debug_enabled, page_profiler, span
+from widgets import poll_job, session_job, upload_digests
+
+# Set Streamlit to wide mode
+st.set_page_config(layout="wide")
+
+# Time the stages of this rerun; ?debug=1 in the URL shows them in the sidebar
+show_timings = debug_enabled(st.query_params)
+profiler = page_profiler("extractionmultiple", st.session_state, trace_memory=show_timings)
+
+# Start downloading the reference files in the background while the page is displayed
+prefetch_references()
+
+# Function run as a background job: extraction of every audit, then the consolidated workbook and columnar tables
+def run_extraction(uploaded_files, uuid_mapping_df, fmt, progress):
+    progress(0, "Extraction des audits")
+    results = extract_batch(
+        uploaded_sources(uploaded_files), uuid_mapping_df,
+        progress=lambda done, total: progress(0.8 * done / total, f"{done}/{total} fichiers extraits")
+    )
+    progress(0.8, "Écriture du fichier Excel consolidé")
+    sites_df, requirements_df, report_df = batch_to_frames(results)
+    workbook = BytesIO()
+    write_batch_workbook(results, workbook)
+    progress(0.9, "Écriture des tables")
+    tables = {}
+    for table_name in ("sites", "requirements"):
+        output = BytesIO()
+        write_table(results, table_name, output, fmt)
+        tables[table_name] = output.getvalue()
+    return {"report": report_df, "sites": sites_df, "workbook": workbook.getvalue(), "tables": tables}
+
+# Streamlit app
+st.title("Extraction de plusieurs audits IFS NEO")
+
+# Step 1: Upload the .ifs files or zip archives
+uploaded_files = st.file_uploader("Charger les fichiers IFS de NEO (ou des archives zip)", type=["ifs", "zip"], accept_multiple_files=True)
+
+# Load the CSV mapping for UUIDs corresponding to NUM, after the first elements of the page are displayed
+try:
+    with st.spinner("Chargement des données de référence..."), span("reference data"):
+        UUID_MAPPING_DF = get_uuid_mapping()
+except ReferenceDataError as e:
+    st.error(str(e))
+    UUID_MAPPING_DF = pd.DataFrame()
+
+if uploaded_files and not UUID_MAPPING_DF.empty:
+    fmt, mime = ("parquet", "application/vnd.apache.parquet") if parquet_available() else ("csv", "text/csv")
+    # The same files, reference and format give the same job: its result is reused
+    job_key = ("batch", upload_digests(uploaded_files), reference_digest("uuid_mapping", UUID_MAPPING_DF), fmt)
+
+    # Step 2: Extract every audit in the background, one job per set of files
+    job = session_job(job_key, 'batch_job', "Lancer l'extraction", run_extraction, uploaded_files, UUID_MAPPING_DF, fmt, name="batch extraction")
+
+    if job is not None and not job.finished:
+        poll_job(job)
+    elif job is not None and job.status == FAILED:
+        st.error(f"Échec de l'extraction : {job.error}")
+    elif job is not None and job.status == CANCELLED:
+        st.info("Extraction annulée.")
+    elif job is not None and job.status == DONE:
+        report_df, sites_df = job.result["report"], job.result["sites"]
+
+        # Step 3: Display the per-file report and the consolidated site data
+        failures = int((report_df["Statut"] != "OK").sum())
+        if failures:
+            st.warning(f"{failures} fichier(s) n'ont pas pu être extraits.")
+        st.subheader("Rapport d'extraction")
+        st.dataframe(report_df)
+        st.subheader("Données des sites")
+        st.dataframe(sites_df)
+
+        # Step 4: Option to download the consolidated workbook
+        st.download_button(
+            label="Télécharger le fichier Excel consolidé",
+            data=job.result["workbook"],
+            file_name='consolidation_audits.xlsx',
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+        # Step 5: Columnar tables for the analytics warehouse (stable schema, can be appended)
+        for table_name, label in (("sites", "champs des sites"), ("requirements", "exigences")):
+            st.download_button(
+                label=f"Télécharger les {label} ({fmt})",
+                data=job.result["tables"][table_name],
+                file_name=f"{table_name}.{fmt}",
+                mime=mime
+            )
+elif UUID_MAPPING_DF.empty:
+    st.error("Impossible de charger les données des UUID. Veuillez vérifier l'URL.")
+else:
+    st.write("Les fichiers de NEO doivent être des (.ifs), éventuellement regroupés dans des archives zip.")
+
+# Debug panel: time and memory of each stage of this rerun
+profiler.finish()
+if show_timings:
+    st.sidebar.subheader("Temps d'exécution")
+    st.sidebar.dataframe(profiler.table(), hide_index=True)
@@ -0,0 +1,37 @@
+import csv
+import json
+
+import pytest
+
+from ifsneo import columnar
+from ifsneo.cli import main
+
+DOCUMENT = {'data': {'modules': {'food_8': {'questions': {'companyCountry': {'answer': 'France'}}}}}}
+
+
+@pytest.fixture
+def audit(tmp_path):
+    path = tmp_path / 'a.ifs'
+    path.write_text(json.dumps(DOCUMENT), encoding='utf-8')
+    return str(path)
+
+
+def test_extract_reports_unreadable_files_and_goes_on(audit, tmp_path, capsys):
+    bad = tmp_path / 'bad.ifs'
+    bad.write_bytes(b'{oops')
+    missing = tmp_path / 'missing.ifs'
+    output = tmp_path / 'sites.csv'
+    assert main(['extract', str(bad), str(missing), audit, '--fields', 'Pays', '-o', str(output)]) == 1
+    errors = capsys.readouterr().err.splitlines()
+    assert [line.split(': ')[1] for line in errors] == [str(bad), str(missing)]
+    with open(output, encoding='utf-8') as f:
+        assert list(csv.DictReader(f)) == [{'Fichier': 'a.ifs', 'Pays': 'France'}]
+
+
+def test_extract_parquet_without_pyarrow(audit, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(columnar, 'parquet_available', lambda: False)
+    with pytest.raises(SystemExit) as exit_info:
+        main(['extract', audit, '-o', str(tmp_path / 'sites.parquet')])
+    assert exit_info.value.code == 2
+    assert 'pyarrow' in capsys.readouterr().err
+    assert not (tmp_path / 'sites.parquet').exists()
@@ -0,0 +1,91 @@
+import copy
+
+import pandas as pd
+import pytest
+
+from ifsneo.diff import diff_documents, diff_frames, document_digests
+from ifsneo.extraction import MISSING
+
+MAPPING = pd.DataFrame({'UUID': ['u1', 'u2', 'u3', 'u4'], 'Num': ['1.1', '1.2', '2.1', '2.2']})
+
+
+def _document(name, scorings):
+    return {'data': {'modules': {'food_8': {
+        'questions': {'companyName': {'answer': name}, 'companyCoid': {'answer': 7}},
+        'checklists': {'checklistFood8': {'resultScorings': scorings}},
+    }}}}
+
+
+def _scoring(score, text='', answers=None):
+    scoring = {'score': {'label': score}, 'answers': {'explanationText': text}}
+    if answers is not None:
+        scoring['answers']['fieldAnswers'] = answers
+    return scoring
+
+
+BEFORE = _document('Usine', {
+    'u1': _scoring('A'),
+    'u2': _scoring('D', 'écart'),
+    'u3': _scoring('B', answers=[{'value': 'oui'}]),
+})
+
+
+def test_identical_documents():
+    diff = diff_documents(BEFORE, copy.deepcopy(BEFORE), MAPPING)
+    assert diff.unchanged
+    assert diff.site_skipped
+    assert diff.compared_requirements == 0
+    assert diff.skipped_requirements == len(MAPPING)
+
+
+def test_score_changes():
+    after = copy.deepcopy(BEFORE)
+    scorings = after['data']['modules']['food_8']['checklists']['checklistFood8']['resultScorings']
+    scorings['u1'] = _scoring('KO')
+    scorings['u2'] = _scoring('A', 'écart')
+    scorings['u4'] = _scoring('C')
+    diff = diff_documents(BEFORE, after, MAPPING)
+    changes = {change.uuid: change for change in diff.requirement_changes}
+    assert set(changes) == {'u1', 'u2', 'u4'}
+    assert (changes['u1'].before, changes['u1'].after) == ('A', 'KO')
+    assert [change.uuid for change in diff.new_non_conformities] == ['u1', 'u4']
+    assert changes['u4'].before == MISSING
+    assert [change.uuid for change in diff.resolved_non_conformities] == ['u2']
+    assert diff.compared_requirements == 3 and diff.skipped_requirements == 1
+    assert diff.site_skipped and not diff.site_changes
+
+
+@pytest.mark.parametrize('answers', [[{'value': 'non'}], [], {'value': 'oui'}])
+def test_edited_field_answers(answers):
+    after = copy.deepcopy(BEFORE)
+    after['data']['modules']['food_8']['checklists']['checklistFood8']['resultScorings']['u3']['answers']['fieldAnswers'] = answers
+    diff = diff_documents(BEFORE, after, MAPPING)
+    assert [(change.uuid, change.score_changed, change.text_changed) for change in diff.requirement_changes] == [('u3', False, True)]
+    assert diff_frames(diff)[1]['Changement'].tolist() == ["Texte modifié"]
+
+
+def test_edited_explanation():
+    after = copy.deepcopy(BEFORE)
+    after['data']['modules']['food_8']['checklists']['checklistFood8']['resultScorings']['u2']['answers']['explanationText'] = 'corrigé'
+    [change] = diff_documents(BEFORE, after, MAPPING).requirement_changes
+    assert change.uuid == 'u2' and change.text_changed and not change.score_changed
+
+
+def test_site_changes_and_digests():
+    after = copy.deepcopy(BEFORE)
+    after['data']['modules']['food_8']['questions']['companyName']['answer'] = 'Nouvelle usine'
+    diff = diff_documents(BEFORE, after, before_digests=document_digests(BEFORE), after_digests=document_digests(after))
+    assert not diff.site_skipped
+    assert [(change.label, change.before, change.after) for change in diff.site_changes] == [
+        ("Nom du site à auditer", 'Usine', 'Nouvelle usine')
+    ]
+    assert diff.requirement_changes == []
+
+
+def test_without_mapping_every_scoring_is_compared():
+    after = copy.deepcopy(BEFORE)
+    scorings = after['data']['modules']['food_8']['checklists']['checklistFood8']['resultScorings']
+    del scorings['u1']
+    scorings['u9'] = _scoring('D')
+    changes = {change.uuid: (change.num, change.before, change.after) for change in diff_documents(BEFORE, after).requirement_changes}
+    assert changes == {'u9': (MISSING, MISSING, 'D'), 'u1': (MISSING, 'A', MISSING)}
@@ -0,0 +1,53 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from ifsneo import exports
+from ifsneo.exports import checklist_frame, write_checklist_workbook
+
+
+class Stop(Exception):
+    pass
+
+
+def _frame(rows):
+    return checklist_frame(pd.DataFrame({
+        'Num': [f'{i}.1' for i in range(rows)],
+        'Explanation': ['explication'] * rows,
+        'Detailed Explanation': ['détail'] * rows,
+        'Score': ['A', 'B', 'NA', 'D'] * (rows // 4),
+    }))
+
+
+@pytest.fixture(params=['xlsxwriter', 'openpyxl'])
+def engine(request, monkeypatch):
+    monkeypatch.setattr(exports, 'excel_engine', lambda: request.param)
+    monkeypatch.setattr(exports, 'PROGRESS_ROWS', 10)
+    return request.param
+
+
+def test_write_checklist_workbook_reports_progress(engine):
+    df = _frame(40)
+    fractions = []
+    output = BytesIO()
+    write_checklist_workbook(df, output, progress=lambda fraction, message=None: fractions.append(fraction))
+    assert len(fractions) > 8
+    assert fractions == sorted(fractions)
+    assert fractions[-1] == 1.0
+    sheets = pd.read_excel(BytesIO(output.getvalue()), sheet_name=None)
+    assert len(sheets["Exigences de la checklist"]) == 40
+    assert len(sheets["Plan d'action"]) == 20
+
+
+def test_write_checklist_workbook_stops_when_progress_raises(engine):
+    calls = []
+
+    def progress(fraction, message=None):
+        calls.append(fraction)
+        if fraction > 0.2:
+            raise Stop
+
+    with pytest.raises(Stop):
+        write_checklist_workbook(_frame(200), BytesIO(), progress=progress)
+    assert calls[-1] < 0.9
@@ -0,0 +1,74 @@
+import pandas as pd
+
+from ifsneo.extraction import MISSING, checklist_table, compact_requirements, flatten_json_safe
+
+PREFIX = 'data_modules_food_8_checklists_checklistFood8_resultScorings'
+
+MAPPING = pd.DataFrame({
+    'UUID': ['u1', 'u2', 'u3', 'u4'],
+    'Num': ['1.1', '1.2', '2.1*', '2.2'],
+    'Chapitre': ['1', '1', '2', '2'],
+}, index=[10, 11, 12, 13])
+
+DOCUMENT = {'data': {'modules': {'food_8': {'checklists': {'checklistFood8': {'resultScorings': {
+    'u1': {'score': {'label': 'A'}, 'answers': {'englishExplanationText': 'ok', 'explanationText': 'ok fr'}},
+    'u3': {'score': {'label': 'D'}, 'answers': {'explanationText': 'écart', 'fieldAnswers': [{'v': 1}]}},
+    'u9': {'score': {'label': 'B'}},
+}}}}}}}
+
+
+def _baseline_checklist(document, mapping):
+    # Row by row lookup in the flattened document, as the pages did before checklist_table
+    flattened = flatten_json_safe(document)
+    rows = []
+    for _, row in mapping.iterrows():
+        prefix = f"{PREFIX}_{row['UUID']}"
+        rows.append({
+            "Num": row['Num'],
+            "UUID": row['UUID'],
+            "Explanation": flattened.get(f"{prefix}_answers_englishExplanationText", "N/A"),
+            "Detailed Explanation": flattened.get(f"{prefix}_answers_explanationText", "N/A"),
+            "Score": flattened.get(f"{prefix}_score_label", "N/A"),
+            "Response": flattened.get(f"{prefix}_answers_fieldAnswers", "N/A"),
+        })
+    return rows
+
+
+def test_checklist_table_matches_row_lookup():
+    table = checklist_table(DOCUMENT, MAPPING)
+    assert table.astype(object).to_dict('records') == _baseline_checklist(DOCUMENT, MAPPING)
+    assert list(table.index) == list(MAPPING.index)
+
+
+def test_checklist_table_fills_missing_scorings():
+    table = checklist_table(DOCUMENT, MAPPING)
+    missing = table[table['UUID'].isin(['u2', 'u4'])]
+    assert (missing[['Explanation', 'Detailed Explanation', 'Score', 'Response']] == MISSING).all().all()
+    assert checklist_table({}, MAPPING)['Score'].tolist() == [MISSING] * 4
+
+
+def test_compact_requirements_keeps_category_types():
+    table = pd.DataFrame({'Score': [True, False, True], 'Response': [1, 0, 1]}, dtype=object)
+    compact = compact_requirements(table, columns=['Score', 'Response'])
+    assert compact['Score'].tolist() == [True, False, True]
+    assert compact['Response'].tolist() == [1, 0, 1]
+    assert [type(value) for value in compact['Score']] == [bool] * 3
+    assert [type(value) for value in compact['Response']] == [int] * 3
+
+
+def test_compact_requirements_shares_equal_categories():
+    first = compact_requirements(pd.DataFrame({'Score': ['A', 'B', 'A']}), columns=['Score'])
+    second = compact_requirements(pd.DataFrame({'Score': ['B', 'A']}), columns=['Score'])
+    assert first['Score'].dtype is second['Score'].dtype
+
+
+def test_compact_requirements_keeps_mixed_answers():
+    answers = [True, 1, 1.0, 'x', None]
+    compact = compact_requirements(pd.DataFrame({'Response': answers}, dtype=object), columns=['Response'])
+    assert compact['Response'].dtype == object
+    assert [(type(value), value) for value in compact['Response']] == [(type(value), value) for value in answers]
+
+
+def test_compact_requirements_keeps_none_in_strings():
+    compact = compact_requirements(pd.DataFrame({'Score': ['A', None, 'A']}, dtype=object), columns=['Score'])
+    assert compact['Score'].tolist() == ['A', None, 'A']
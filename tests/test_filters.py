@@ -0,0 +1,63 @@
+from itertools import product
+
+import pandas as pd
+import pytest
+
+from ifsneo.filters import ALL, UUID_MAPPING_LEVELS, HierarchyIndex
+
+MAPPING = pd.DataFrame({
+    'Chapitre': ['1', '1', '1', '2', '2', '3', '3'],
+    'Theme': ['a', 'a', 'b', 'a', 'c', None, 'd'],
+    'SSTheme': ['x', 'y', 'x', 'z', None, 'w', 'w'],
+}, index=[5, 6, 7, 8, 9, 10, 11])
+
+
+def _baseline_filters(df, chapitre, theme, sstheme):
+    # Linked filters of the pages before HierarchyIndex: (theme options, sub-theme options, rows)
+    filtered_df = df
+    if chapitre != ALL:
+        filtered_df = filtered_df[filtered_df['Chapitre'] == chapitre]
+        theme_options = sorted(filtered_df['Theme'].dropna().unique())
+    else:
+        theme_options = sorted(df['Theme'].dropna().unique())
+    if theme != ALL:
+        filtered_df = filtered_df[filtered_df['Theme'] == theme]
+        sstheme_options = sorted(filtered_df['SSTheme'].dropna().unique())
+    else:
+        sstheme_options = sorted(df['SSTheme'].dropna().unique())
+    if sstheme != ALL:
+        filtered_df = filtered_df[filtered_df['SSTheme'] == sstheme]
+    return theme_options, sstheme_options, list(filtered_df.index)
+
+
+SELECTIONS = list(product([ALL, '1', '2', '3', '9'], [ALL, 'a', 'b', 'c', 'd'], [ALL, 'w', 'x', 'y', 'z']))
+
+
+@pytest.fixture(scope='module')
+def index():
+    return HierarchyIndex(MAPPING, UUID_MAPPING_LEVELS)
+
+
+def test_chapter_options(index):
+    assert index.options('Chapitre') == sorted(MAPPING['Chapitre'].dropna().unique())
+
+
+@pytest.mark.parametrize('chapitre,theme,sstheme', SELECTIONS)
+def test_rows_match_baseline(index, chapitre, theme, sstheme):
+    assert index.rows(chapitre, theme, sstheme) == _baseline_filters(MAPPING, chapitre, theme, sstheme)[2]
+    assert list(index.filter(MAPPING, chapitre, theme, sstheme).index) == index.rows(chapitre, theme, sstheme)
+
+
+@pytest.mark.parametrize('chapitre,theme,sstheme', SELECTIONS)
+def test_options_match_baseline(index, chapitre, theme, sstheme):
+    theme_options, sstheme_options, _ = _baseline_filters(MAPPING, chapitre, theme, sstheme)
+    assert index.options('Theme', chapitre) == theme_options
+    if chapitre == ALL or theme != ALL:
+        assert index.options('SSTheme', chapitre, theme) == sstheme_options
+
+
+@pytest.mark.parametrize('chapitre', ['1', '2', '3'])
+def test_sub_theme_options_follow_chapter(index, chapitre):
+    # Unlike the former pages, the sub-themes follow the chapter when the theme is left on "Tous"
+    expected = sorted(MAPPING.loc[MAPPING['Chapitre'] == chapitre, 'SSTheme'].dropna().unique())
+    assert index.options('SSTheme', chapitre, ALL) == expected
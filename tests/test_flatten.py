@@ -0,0 +1,52 @@
+import pytest
+
+from ifsneo.extraction import flatten_json_safe, iter_flatten
+
+
+def _baseline_flatten(nested_json, parent_key='', sep='_'):
+    # Recursive flattener of the pages before ifsneo, kept as the reference
+    items = []
+    if isinstance(nested_json, dict):
+        for k, v in nested_json.items():
+            new_key = f'{parent_key}{sep}{k}' if parent_key else k
+            if isinstance(v, dict):
+                items.extend(_baseline_flatten(v, new_key, sep=sep).items())
+            elif isinstance(v, list):
+                for i, item in enumerate(v):
+                    items.extend(_baseline_flatten(item, f'{new_key}{sep}{i}', sep=sep).items())
+            else:
+                items.append((new_key, v))
+    else:
+        items.append((parent_key, nested_json))
+    return dict(items)
+
+
+DOCUMENTS = [
+    {},
+    {'a': 1, 'b': None, 'c': 'text'},
+    {'a': {'b': {'c': 1, 'd': [1, {'e': 2}, [3, 4], []]}, 'f': {}}, 'g': [{'h': True}, 'i']},
+    {'a_b': {'c': 'first'}, 'a': {'b_c': 'last'}, 'x': [[{'y': 0.5}]]},
+    {'data': {'modules': {'food_8': {'questions': {'companyName': {'answer': 'Société'}}}}}},
+]
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_iter_flatten_matches_baseline(document):
+    expected = _baseline_flatten(document)
+    assert list(flatten_json_safe(document).items()) == list(expected.items())
+    assert list(dict(iter_flatten(document))) == list(expected)
+
+
+def test_iter_flatten_deep_document():
+    document = leaf = {}
+    for _ in range(5000):
+        leaf['n'] = {}
+        leaf = leaf['n']
+    leaf['v'] = 1
+    assert list(iter_flatten(document)) == [('_'.join(['n'] * 5000 + ['v']), 1)]
+
+
+def test_iter_flatten_prefixes():
+    document = DOCUMENTS[2]
+    expected = [(key, value) for key, value in _baseline_flatten(document).items() if key.startswith('a_b_d')]
+    assert list(iter_flatten(document, prefixes=['a_b_d'])) == expected
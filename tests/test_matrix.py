@@ -0,0 +1,52 @@
+from itertools import product
+
+import pytest
+
+from ifsneo.matrix import NON_CONFORMITY_SCORES, MatrixIndex
+
+MATRIX_RESULT = [
+    {'type': t, 'levelId': level, 'chapterId': chapter, 'scoreId': score, 'count': count}
+    for count, (t, level, chapter, score) in enumerate(product(
+        ['requirement', 'ko'], ['foundation', 'higher'], ['1', '2', '3'], ['A', 'B', 'C', 'D', 'MAJOR', 'KO', 'NA'],
+    ))
+    if count % 3
+] + [{'chapterId': '4', 'count': 0}]
+
+
+def _scan(matrix_result, chapter=None, scores=None, level=None, type=None):
+    # List comprehension of the former pages
+    if isinstance(scores, str):
+        scores = [scores]
+    return [
+        item for item in matrix_result
+        if (chapter is None or item.get('chapterId') == chapter)
+        and (scores is None or item.get('scoreId') in scores)
+        and (level is None or item.get('levelId') == level)
+        and (type is None or item.get('type') == type)
+    ]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return MatrixIndex(MATRIX_RESULT)
+
+
+@pytest.mark.parametrize('chapter,scores,level,type', list(product(
+    [None, '1', '3', '4', '9'],
+    [None, 'A', ['A', 'B'], ('NA',), set(NON_CONFORMITY_SCORES), []],
+    [None, 'higher'],
+    [None, 'ko', 'other'],
+)))
+def test_select_matches_scan(index, chapter, scores, level, type):
+    assert index.select(chapter, scores, level, type) == _scan(MATRIX_RESULT, chapter, scores, level, type)
+
+
+@pytest.mark.parametrize('chapter', [None, '1', '2', '9'])
+def test_non_conformities_match_scan(index, chapter):
+    assert index.non_conformities(chapter) == _scan(MATRIX_RESULT, chapter, NON_CONFORMITY_SCORES)
+
+
+def test_select_keeps_items(index):
+    selected = index.select(chapter='2')
+    assert all(any(item is original for original in MATRIX_RESULT) for item in selected)
+    assert index.select() == MATRIX_RESULT
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+import types
+from collections import OrderedDict
+
+import pytest
+
+from ifsneo import modules
+from ifsneo.modules import NeoModule, UnsupportedModuleError, detect_module, register_module
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(modules, '_registry', OrderedDict(modules._registry))
+    monkeypatch.setattr(modules, '_loaded', {})
+    plugin = types.ModuleType('tests_plugin_other')
+    plugin.MODULE = NeoModule('other', "Other", None, None, ('data', 'modules', 'other', 'checklist'))
+    monkeypatch.setitem(sys.modules, 'tests_plugin_other', plugin)
+    register_module('other', 'tests_plugin_other')
+
+
+def test_detect_module_first_registered(registry):
+    # 'other' comes first in the document, but food_8 was registered first
+    document = {'data': {'modules': {'other': {}, 'food_8': {}}}}
+    assert detect_module(document).name == 'food_8'
+    assert detect_module({'data': {'modules': {'other': {}}}}).name == 'other'
+
+
+def test_detect_module_unsupported(registry):
+    with pytest.raises(UnsupportedModuleError):
+        detect_module({'data': {'modules': {'unknown': {}}}})
+    with pytest.raises(UnsupportedModuleError):
+        detect_module({'data': {'modules': []}})
+
+
+def test_plugin_imported_on_first_use():
+    code = (
+        "import sys, ifsneo\n"
+        "assert 'ifsneo.mapping' not in sys.modules\n"
+        "ifsneo.detect_module({'data': {'modules': {'food_8': {}}}})\n"
+        "assert 'ifsneo.mapping' in sys.modules\n"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
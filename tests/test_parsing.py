@@ -0,0 +1,43 @@
+import json
+from io import BytesIO
+
+import pytest
+
+from ifsneo.parsing import UTF8_BOM, load_document
+
+DOCUMENT = {'data': {'modules': {'food_8': {'questions': {'companyName': {'answer': 'Société'}}}}}}
+
+
+class _Stream:
+    """Binary file object that cannot seek, like a network stream."""
+
+    def __init__(self, data):
+        self._fp = BytesIO(data)
+
+    def read(self, size=-1):
+        return self._fp.read(size)
+
+    def seekable(self):
+        return False
+
+
+@pytest.mark.parametrize('streaming', [True, False])
+def test_load_document_with_bom(streaming):
+    data = UTF8_BOM + json.dumps(DOCUMENT, ensure_ascii=False).encode('utf-8')
+    assert load_document(BytesIO(data), prefixes=['data'], streaming=streaming) == DOCUMENT
+
+
+def test_load_document_with_bom_from_stream():
+    data = UTF8_BOM + json.dumps(DOCUMENT).encode('utf-8')
+    assert load_document(_Stream(data), prefixes=['data']) == DOCUMENT
+
+
+@pytest.mark.parametrize('fp', [BytesIO, _Stream])
+def test_load_document_without_bom(fp):
+    data = json.dumps(DOCUMENT).encode('utf-8')
+    assert load_document(fp(data), prefixes=['data']) == DOCUMENT
+
+
+def test_load_document_invalid():
+    with pytest.raises(json.JSONDecodeError):
+        load_document(BytesIO(UTF8_BOM + b'{oops'), prefixes=['data'])
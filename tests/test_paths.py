@@ -0,0 +1,51 @@
+import pytest
+
+from ifsneo.extraction import MISSING, extract_from_document, extract_from_flattened, flatten_json_safe
+from ifsneo.paths import get_flat_key, resolve_flat_key
+
+QUESTIONS = {
+    'companyName': {'answer': 'Société'},
+    'scopeCertificateScopeDescription_en': {'answer': 'Scope'},
+    'scopeCertificateScopeDescription': {'answer': 'Périmètre'},
+    'companyGln': {'answer': [{'rootQuestions': {'companyGlnNumber': {'answer': '123'}}}]},
+}
+DOCUMENT = {'data': {'modules': {'food_8': {'questions': QUESTIONS}}}}
+PREFIX = 'data_modules_food_8_questions_'
+
+
+@pytest.mark.parametrize('key', [
+    'companyName_answer',
+    'scopeCertificateScopeDescription_en_answer',
+    'scopeCertificateScopeDescription_answer',
+    'companyGln_answer_0_rootQuestions_companyGlnNumber_answer',
+])
+def test_flat_key_with_underscores(key):
+    assert get_flat_key(DOCUMENT, PREFIX + key, MISSING) == flatten_json_safe(DOCUMENT)[PREFIX + key]
+
+
+def test_unknown_flat_key():
+    assert get_flat_key(DOCUMENT, PREFIX + 'companyName_missing', MISSING) == MISSING
+    assert get_flat_key(DOCUMENT, PREFIX + 'companyGln_answer_3', MISSING) == MISSING
+
+
+@pytest.mark.parametrize('document', [
+    {'a_b': {'c': 'first'}, 'a': {'b_c': 'last'}},
+    {'a': {'b_c': 'first'}, 'a_b': {'c': 'last'}},
+    {'a': {'b': {'c': 'first'}, 'b_c': 'last'}},
+])
+def test_ambiguous_flat_key_last_key_wins(document):
+    # Several keys flatten to a_b_c: the one flattened last overwrote the others
+    assert flatten_json_safe(document)['a_b_c'] == 'last'
+    assert get_flat_key(document, 'a_b_c', MISSING) == 'last'
+
+
+def test_ambiguous_flat_key_skips_dead_ends():
+    # a is last, but a_b_c does not lead anywhere below it
+    document = {'a_b': {'c': 'value'}, 'a': {'b': 'leaf'}}
+    assert resolve_flat_key(document, 'a_b_c') == ('a_b', 'c')
+    assert get_flat_key(document, 'a_b_c', MISSING) == flatten_json_safe(document)['a_b_c']
+
+
+def test_extract_from_document_matches_flattened_lookup():
+    mapping = {key: PREFIX + key for key in ('companyName_answer', 'scopeCertificateScopeDescription_en_answer', 'nothing')}
+    assert extract_from_document(DOCUMENT, mapping) == extract_from_flattened(flatten_json_safe(DOCUMENT), mapping)
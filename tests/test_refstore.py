@@ -0,0 +1,76 @@
+import time
+
+import pandas as pd
+import pytest
+
+from ifsneo import refstore
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setenv('IFSNEO_OFFLINE', '1')
+    refstore.clear_memory_cache()
+    yield
+    refstore.clear_memory_cache()
+
+
+def _mapping(chapters):
+    return pd.DataFrame({
+        'UUID': [f'u{i}' for i in range(len(chapters))],
+        'Chapitre': chapters,
+        'Theme': ['t'] * len(chapters),
+        'SSTheme': ['s'] * len(chapters),
+    })
+
+
+def test_uuid_mapping_with_index_follows_refresh():
+    old, new = _mapping(['1', '2']), _mapping(['1', '2', '3'])
+    with refstore._lock:
+        refstore._remember('uuid_mapping', old, {'checked_at': time.time()})
+    df, index = refstore.get_uuid_mapping_with_index()
+    assert df is old
+    assert index is refstore.get_uuid_mapping_index()
+    with refstore._lock:
+        refstore._remember('uuid_mapping', new, {'checked_at': time.time()})
+    df, index = refstore.get_uuid_mapping_with_index()
+    assert df is new
+    assert list(index.options('Chapitre')) == ['1', '2', '3']
+
+
+CSV = 'UUID,Num,Chapitre,Theme,SSTheme\nu1,1.1,1,t,s\n'
+
+
+@pytest.fixture
+def download(monkeypatch, tmp_path):
+    # Online store with an empty cache folder and no snapshot; returns a function setting the downloaded text
+    monkeypatch.setenv('IFSNEO_OFFLINE', '0')
+    monkeypatch.setenv('IFSNEO_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(refstore, 'SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+
+    def serve(text):
+        monkeypatch.setattr(refstore, 'fetch_reference_text', lambda url, etag=None: (text, 'etag'))
+
+    return serve
+
+
+def test_download_served_when_cache_is_not_writable(download, monkeypatch, tmp_path):
+    download(CSV)
+    # The cache folder is a file: it cannot be created
+    (tmp_path / 'cache').write_text('')
+    df = refstore.get_uuid_mapping()
+    assert df['UUID'].tolist() == ['u1']
+    assert refstore.get_uuid_mapping() is df
+
+
+@pytest.mark.parametrize('text', ['', 'UUID,Num\n"u1,1.1\n', 'a,b\n1,2\n'])
+def test_unreadable_download_raises_reference_data_error(download, text):
+    download(text)
+    with pytest.raises(refstore.ReferenceDataError):
+        refstore.get_uuid_mapping()
+
+
+def test_unreadable_download_keeps_local_copy(download):
+    download(CSV)
+    df = refstore.get_uuid_mapping()
+    download('')
+    assert refstore.get_reference('uuid_mapping', refresh=True) is df
@@ -0,0 +1,95 @@
+import json
+
+import pandas as pd
+
+from ifsneo.batch import AuditResult
+from ifsneo.store import AuditStore
+
+COLUMNS = ['UUID', 'Num', 'Score', 'Explanation', 'Detailed Explanation', 'Response']
+
+
+def _result(rows):
+    requirements = pd.DataFrame(rows, columns=COLUMNS)
+    return AuditResult('a.ifs', module='food_8', coid=1, requirements=requirements, digest='d', audit_date='2024-01-01')
+
+
+def test_add_result_indexes_each_scoring_once():
+    rows = [(f'u{i}', f'1.{i}', 'A', f'allergènes {i}', '', '') for i in range(10)]
+    rows.append(('u3', '1.3', 'D', 'allergènes en double', '', ''))
+    with AuditStore(':memory:') as store:
+        audit_id, added = store.add_result(_result(rows))
+        assert added
+        hits = store.search('allergènes', limit=100)
+        assert len(hits) == 10
+        assert [hit['score'] for hit in hits if hit['uuid'] == 'u3'] == ['A']
+        assert store.findings(uuid='u3', scores=['A'])[0]['explanation'] == 'allergènes 3'
+
+
+MAPPING = pd.DataFrame({'UUID': ['u1', 'u2', 'u3'], 'Num': ['1.1', '1.2', '2.1']})
+
+
+def _audit_file(coid, date, scores):
+    questions = {'companyCoid': {'answer': coid}, 'auditDate': {'answer': date}}
+    scorings = {uuid: {'score': {'label': score}, 'answers': {'explanationText': f'{uuid} {score}'}} for uuid, score in scores.items()}
+    document = {'data': {'modules': {'food_8': {
+        'questions': questions,
+        'checklists': {'checklistFood8': {'resultScorings': scorings}},
+    }}}}
+    return json.dumps(document).encode('utf-8')
+
+
+SOURCES = [
+    ('a.ifs', _audit_file(1, '2024-01-01', {'u1': 'A', 'u2': 'D', 'u3': 'KO'})),
+    ('b.ifs', _audit_file(2, '2024-02-01', {'u1': 'D', 'u2': 'D'})),
+]
+
+
+def test_ingest_skips_stored_files():
+    with AuditStore(':memory:') as store:
+        results = store.ingest(SOURCES, MAPPING, max_workers=1)
+        assert [result.ok for result in results] == [True, True]
+        assert len(store) == 2
+        revision = store.revision()
+        # The same contents under other names are already stored
+        assert store.ingest([('copy of a.ifs', SOURCES[0][1]), ('b.ifs', SOURCES[1][1])], MAPPING, max_workers=1) == []
+        assert len(store) == 2
+        assert store.revision() == revision
+        assert store.add_result(results[0]) == (store.audit_id(results[0].digest), False)
+
+
+def test_requirement_score_counts():
+    with AuditStore(':memory:') as store:
+        store.ingest(SOURCES, MAPPING, max_workers=1)
+        counts = {(row['uuid'], row['score']): (row['num'], row['audits']) for row in store.requirement_score_counts()}
+        assert counts == {
+            ('u1', 'A'): ('1.1', 1),
+            ('u1', 'D'): ('1.1', 1),
+            ('u2', 'D'): ('1.2', 2),
+            ('u3', 'KO'): ('2.1', 1),
+            ('u3', 'N/A'): ('2.1', 1),
+        }
+        assert {(row['uuid'], row['score']) for row in store.requirement_score_counts(['KO'])} == {('u3', 'KO')}
+        # Removing an audit updates the counts
+        store.remove(store.audits(coid=2)[0]['id'])
+        counts = {(row['uuid'], row['score']): row['audits'] for row in store.requirement_score_counts(['D'])}
+        assert counts == {('u2', 'D'): 1}
+
+
+def test_revision_changes_when_an_id_is_reused():
+    with AuditStore(':memory:') as store:
+        results = store.ingest(SOURCES, MAPPING, max_workers=1)
+        revisions = [store.revision()]
+        audit_id = store.audit_id(results[1].digest)
+        store.remove(audit_id)
+        revisions.append(store.revision())
+        # SQLite gives the next audit the id of the removed one
+        assert store.add_result(results[1]) == (audit_id, True)
+        revisions.append(store.revision())
+        assert len(set(revisions)) == 3
+
+
+def test_ingest_reports_progress():
+    calls = []
+    with AuditStore(':memory:') as store:
+        store.ingest(SOURCES, MAPPING, max_workers=1, progress=lambda done, total: calls.append((done, total)))
+    assert calls == [(1, 2), (2, 2)]
@@ -1,6 +1,8 @@
 import json
 import pandas as pd
 import streamlit as st
+import ifsneo
+from ifsneo.timing import debug_enabled, page_profiler, span
 
 # Custom CSS for enabling line breaks in table cells
 def local_css():
@@ -17,34 +19,45 @@ def local_css():
 # Load custom CSS for line breaks
 local_css()
 
-# Step 1: Load the CSV Checklist from the provided URL with error handling
-@st.cache_data
-def load_checklist(url):
-    try:
-        # Load the CSV file with the necessary encoding and handling of bad lines
-        return pd.read_csv(url, sep=";", encoding='utf-8', on_bad_lines='skip')
-    except pd.errors.ParserError as e:
-        st.error(f"Error parsing CSV file: {e}")
-        return None
+# Time the stages of this rerun; ?debug=1 in the URL shows them in the sidebar
+show_timings = debug_enabled(st.query_params)
+profiler = page_profiler("version1Ifsv8", st.session_state, trace_memory=show_timings)
+
+# Start downloading the reference files in the background while the page is displayed
+ifsneo.prefetch_references()
 
-checklist_url = "https://raw.githubusercontent.com/M00N69/Action-planGroq/main/Guide%20Checklist_IFS%20Food%20V%208%20-%20CHECKLIST.csv"
-checklist_df = load_checklist(checklist_url)
+# Step 1: Load the CSV Checklist from the local reference store with error handling
+def load_checklist():
+    try:
+        with st.spinner("Loading the checklist..."), span("reference data"):
+            return ifsneo.get_checklist_with_index()
+    except ifsneo.ReferenceDataError as e:
+        st.error(str(e))
+        return None, None
 
 # Step 2: Upload the JSON file
 uploaded_file = st.file_uploader("Upload JSON file", type="json")
 
+# The checklist is read once the uploader is displayed
+checklist_df, checklist_index = load_checklist()
+
 if uploaded_file and checklist_df is not None:
     try:
         # Step 3: Load the uploaded JSON file
-        data = json.load(uploaded_file)
+        cached_document = ifsneo.session_document_cache(st.session_state).load(uploaded_file.getvalue())
+        data = cached_document.document
+
+        # Find the NEO module of the audit (food_8, ...) among the registered ones
+        neo_modules = ifsneo.document_modules(data)
+        if neo_modules:
+            neo_module = ifsneo.get_module(neo_modules[0])
 
-        # Check if the expected 'data' and 'modules' keys exist
-        if "data" in data and "modules" in data["data"] and "food_8" in data["data"]["modules"]:
-            food_8 = data['data']['modules']['food_8']
-            
             # Extract data for overall results and matrix
-            overall_result = food_8['result']['overall']
-            matrix_result = food_8['matrixResult']
+            overall_result = neo_module.overall(data)
+            matrix_result = neo_module.matrix(data)
+            # Index the matrix once per upload for the chapter and non-conformity views
+            with span("matrix index"):
+                matrix_index = cached_document.derived('matrix_index', lambda: ifsneo.MatrixIndex(matrix_result))
             
             # Step 4: Display Overall Audit Results
             st.title("Audit Overview")
@@ -60,28 +73,23 @@ if uploaded_file and checklist_df is not None:
             if section == "Chapters & Scores":
                 st.header("Chapter, Section, and Subsection-wise Scores and Compliance")
                 
-                # Get unique chapters, sections, and subsections from the CSV file
-                unique_chapters = sorted(checklist_df["CHAPITRE"].unique())
-                selected_chapter = st.selectbox("Select a Chapter", unique_chapters)
+                # Get unique chapters, sections, and subsections from the prebuilt checklist index
+                selected_chapter = st.selectbox("Select a Chapter", checklist_index.options("CHAPITRE"))
 
-                # Filter sections based on the selected chapter
-                chapter_sections = checklist_df[checklist_df["CHAPITRE"] == selected_chapter]
-                unique_sections = sorted(chapter_sections["SECTION"].unique())
-                selected_section = st.selectbox("Select a Section", unique_sections)
+                # Sections of the selected chapter
+                selected_section = st.selectbox("Select a Section", checklist_index.options("SECTION", selected_chapter))
 
-                # Filter subsections based on the selected section
-                section_subsections = chapter_sections[chapter_sections["SECTION"] == selected_section]
-                unique_subsections = sorted(section_subsections["SOUS_SECTION"].unique())
-                selected_subsection = st.selectbox("Select a Subsection", unique_subsections)
+                # Subsections of the selected section
+                selected_subsection = st.selectbox("Select a Subsection", checklist_index.options("SOUS_SECTION", selected_chapter, selected_section))
 
                 # Display filtered requirements from the checklist
-                filtered_requirements = section_subsections[section_subsections["SOUS_SECTION"] == selected_subsection]
+                filtered_requirements = checklist_index.filter(checklist_df, selected_chapter, selected_section, selected_subsection)
                 st.subheader(f"Requirements for Chapter {selected_chapter}, Section {selected_section}, Subsection {selected_subsection}")
                 st.dataframe(filtered_requirements)
 
                 # Extract corresponding requirements from the JSON based on NUM_REQ from the checklist
-                requirement_ids = filtered_requirements["NUM_REQ"].tolist()
-                chapter_data = [item for item in matrix_result if item['chapterId'] == str(selected_chapter) and item['scoreId'] in requirement_ids]
+                requirement_ids = set(filtered_requirements["NUM_REQ"])
+                chapter_data = matrix_index.select(chapter=str(selected_chapter), scores=requirement_ids)
 
                 if chapter_data:
                     st.subheader(f"Scores for Chapter {selected_chapter}")
@@ -97,7 +105,7 @@ if uploaded_file and checklist_df is not None:
 
                 # Filter for non-conformities
                 if st.checkbox("Show Non-Conformities Only"):
-                    non_conformities = [item for item in matrix_result if item['chapterId'] == str(selected_chapter) and item['scoreId'] in ['C', 'D', 'MAJOR', 'KO']]
+                    non_conformities = matrix_index.non_conformities(chapter=str(selected_chapter))
                     if non_conformities:
                         df_nc = pd.DataFrame(non_conformities)
                         st.subheader("Non-conformities in the selected chapter:")
@@ -110,7 +118,7 @@ if uploaded_file and checklist_df is not None:
                 st.header("Requirements, Scores, and Non-Conformities")
 
                 # Extract requirements and scores (Assuming this part is structured like the previous part)
-                checklists = food_8['checklists']['checklistFood8']['resultScorings']
+                checklists = ifsneo.get_path(data, neo_module.checklist_path, {})
                 
                 # Now link the NUM_REQ from the CSV with the JSON requirement IDs
                 csv_num_reqs = checklist_df["NUM_REQ"].tolist()
@@ -141,7 +149,7 @@ if uploaded_file and checklist_df is not None:
 
             if show_non_conformities:
                 st.header("All Non-conformities Across the Audit")
-                all_non_conformities = [item for item in matrix_result if item.get('scoreId') in ['C', 'D', 'MAJOR', 'KO']]
+                all_non_conformities = matrix_index.non_conformities()
                 if all_non_conformities:
                     df_all_nc = pd.DataFrame(all_non_conformities)
                     st.dataframe(df_all_nc[['type', 'levelId', 'chapterId', 'scoreId', 'count']])
@@ -149,7 +157,7 @@ if uploaded_file and checklist_df is not None:
                     st.write("No non-conformities found across the audit.")
 
         else:
-            st.error("The expected 'data', 'modules', or 'food_8' key does not exist in the uploaded JSON.")
+            st.error(f"The uploaded JSON contains none of the supported NEO modules ({', '.join(ifsneo.registered_modules())}).")
 
     except json.JSONDecodeError:
         st.error("The file could not be decoded as a JSON. Please check the file format.")
@@ -157,11 +165,8 @@ if uploaded_file and checklist_df is not None:
 else:
     st.write("Please upload a JSON file to begin.")
 
-
-
-
-
-
-
-
-
+# Debug panel: time and memory of each stage of this rerun
+profiler.finish()
+if show_timings:
+    st.sidebar.subheader("Execution times")
+    st.sidebar.dataframe(profiler.table(), hide_index=True)
@@ -0,0 +1,73 @@
+# Streamlit widgets shared by the pages; the ifsneo package itself stays Streamlit-free
+import streamlit as st
+from ifsneo.batch import content_digest
+from ifsneo.jobs import default_queue
+from ifsneo.pagination import PAGE_SIZES, page_count, paginate, search
+from ifsneo.timing import span
+
+# Function to return the (name, SHA-256) of each uploaded file, hashed once per upload of the session
+def upload_digests(uploaded_files):
+    """Key of a set of uploaded files; reruns that keep the same files (same file_id and size) hash nothing."""
+    known = st.session_state.get('upload_digests', {})
+    digests = {}
+    for uploaded_file in uploaded_files:
+        key = (uploaded_file.file_id, uploaded_file.size)
+        digests[key] = known.get(key) or content_digest(uploaded_file.getvalue())
+    # Only the files still uploaded are kept
+    st.session_state['upload_digests'] = digests
+    return tuple((uploaded_file.name, digests[(uploaded_file.file_id, uploaded_file.size)]) for uploaded_file in uploaded_files)
+
+# Function to find the background job of key, or submit it when the button is clicked
+def session_job(key, session_key, button_label, function, *args, name=None):
+    """Return the job of key: pending, running or done for any session of the server, else
+    submitted when the button is clicked, else the last job of this session for key if it
+    failed or was cancelled (its id kept in st.session_state[session_key]); None otherwise.
+
+    function(*args, progress=...) runs in the job queue: args should be cheap to build,
+    the heavy work belongs in function.
+    """
+    queue = default_queue()
+    job = queue.find(key)
+    if job is None and st.button(button_label):
+        job = queue.submit(key, function, *args, name=name)
+        st.session_state[session_key] = job.id
+    if job is None:
+        job = queue.get(st.session_state.get(session_key))
+        if job is not None and job.key != key:
+            job = None
+    return job
+
+# Function to display the progress of an unfinished job, polled every second until it is finished
+def poll_job(job):
+    @st.fragment(run_every=1)
+    def poll():
+        if job.finished:
+            st.rerun()
+        st.progress(job.progress, text=job.status_label if job.message is None else f"{job.status_label} : {job.message}")
+        if st.button("Annuler", key=f"cancel_{job.id}"):
+            default_queue().cancel(job.id)
+            st.rerun()
+    poll()
+
+# Function to display a table one page at a time with a search box: only the rows of the page are sent to the browser
+def display_table_page(df, key, text=None):
+    """Search box, page size and page number of the table df; the widget keys start with key.
+
+    text is the search_text() of df, passed to ifsneo.pagination.search().
+    """
+    col1, col2 = st.columns([4, 1])
+    query = col1.text_input("Rechercher", key=f"{key}_query")
+    page_size = col2.selectbox("Lignes par page", PAGE_SIZES, key=f"{key}_page_size")
+    with span("table search", rows=len(df)):
+        rows = search(df, query, text)
+    pages = page_count(len(rows), page_size)
+    number = 1
+    if pages > 1:
+        # The key changes with the search results, so the page number goes back to 1
+        number = st.number_input(f"Page (sur {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page_{query}_{page_size}_{len(rows)}")
+    table_page = paginate(rows, number, page_size)
+    if table_page.total:
+        st.caption(f"Lignes {table_page.first} à {table_page.first + len(table_page.rows) - 1} sur {table_page.total}")
+    with span("table page", rows=len(table_page.rows)):
+        # Values are shown as text, as in the former HTML table
+        st.dataframe(table_page.rows.astype(str), hide_index=True, use_container_width=True)